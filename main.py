@@ -1,142 +1,78 @@
-class Snake:
-    def __init__(self, start_pos, direction, color, controls=None, is_bot=False):
-        self.body = [start_pos]
-        self.direction = direction
-        self.next_direction = direction  # Буфер для следующего направления
-        self.direction_changed = False  # Флаг для предотвращения множественных изменений
-        self.color = color
-        self.controls = controls or {}
-        self.is_bot = is_bot
-        self.grow_pending = 0
-        self.alive = True
-        self.score = 0
-        self.bot_speedup = False  # Бот решает сам когда ускоряться
-
-    def get_head(self):
-        return self.body[0]
-
-    def set_direction(self, key):
-        if key in self.controls and not self.direction_changed:
-            new_dir = self.controls[key]
-            # Запретить разворот назад (проверяем против текущего direction)
-            if (new_dir[0] != -self.direction[0] or new_dir[1] != -self.direction[1]):
-                self.next_direction = new_dir
-                self.direction_changed = True
-
-    def move(self, wrap_around=False, field_width=None, field_height=None):
-        if field_width is None:
-            field_width = 600  # WIDTH
-        if field_height is None:
-            field_height = 600  # HEIGHT
-        # Применяем буферизованное направление
-        self.direction = self.next_direction
-        self.direction_changed = False  # Сбрасываем флаг после применения
-        head_x, head_y = self.body[0]
-        dx, dy = self.direction
-        new_head = (head_x + dx, head_y + dy)
-        if wrap_around:
-            new_head = (new_head[0] % field_width, new_head[1] % field_height)
-        # Если не растём, удаляем хвост перед проверкой коллизии, чтобы не умирать на месте после еды
-        if self.grow_pending == 0:
-            tail = self.body.pop()
-        self.body.insert(0, new_head)
-        if self.grow_pending > 0:
-            self.grow_pending -= 1
-        # Если не растём, хвост уже удалён выше
-
-    def grow(self, n=1):
-        self.grow_pending += n
-
-    def check_collision(self, walls, snakes, walls_enabled=True, field_width=None, field_height=None, wrap_around=False):
-        head = self.get_head()
-        # Нормализуем координаты головы к сетке
-        head_grid = ((head[0] // CELL_SIZE) * CELL_SIZE, (head[1] // CELL_SIZE) * CELL_SIZE)
-        # Серые стены убивают только если walls_enabled=True
-        if walls_enabled and head_grid in walls:
-            self.alive = False
-            return
-        # Границы убивают только если wrap_around == False
-        if not wrap_around:
-            if field_width is None:
-                field_width = 600
-            if field_height is None:
-                field_height = 600
-            if head[0] < 0 or head[0] >= field_width or head[1] < 0 or head[1] >= field_height:
-                self.alive = False
-                return
-        # Проверка столкновения с собой
-        if head in self.body[1:]:
-            self.alive = False
-            return
-        # Проверка столкновения с другими змеями
-        for snake in snakes:
-            if snake is not self:
-                if head == snake.get_head():
-                    self.alive = False
-                    return
-                elif head in snake.body[1:]:
-                    self.alive = False
-                    return
+from snake_core import Snake as BaseSnake, SnakeSimulation, WIDTH, HEIGHT, CELL_SIZE
+from snake_core import UP, DOWN, LEFT, RIGHT
+from snake_replay import ReplayRecorder
 
-    def draw(self, screen):
+
+class Snake(BaseSnake):
+    # Логика змеи живет в snake_core, здесь только отрисовка
+    previous_tail = None  # Клетка, с которой хвост ушел на последнем ходе (ставит SnakeGame.move)
+
+    def sprites(self, alpha=1.0):
+        """Спрайты змеи: (голова, [сегменты тела]) — каждый как (поверхность, позиция). alpha < 1 —
+        кадр между ходами: голова и хвост еще на пути из прошлых клеток (голова — из клетки,
+        где теперь шея, хвост — из previous_tail)"""
+        head_color = self.color
+        body_color = tuple(max(0, c - 30) for c in self.color)
+        # Тело — готовые спрайты; сужение к хвосту от 1.0 до 0.5 дает всего
+        # CELL_SIZE // 2 + 1 размеров, на каждый из них спрайт рисуется один раз
+        body_length = len(self.body)
+        head = None
+        segments = []
+        if alpha < 1:
+            # Между ходами едут только голова (из клетки шеи) и хвост (из previous_tail); середина
+            # уже в своих клетках — змея так же сплошная, а в кадре меняются лишь две клетки
+            tail_from = self.previous_tail or self.body[-1]
+            head_from = self.body[1] if body_length > 1 else tail_from
         for i, segment in enumerate(self.body):
-            # Рисуем строго по сетке
-            x = (segment[0] // CELL_SIZE) * CELL_SIZE
-            y = (segment[1] // CELL_SIZE) * CELL_SIZE
-            
-            # Сужение к концу хвоста
-            body_length = len(self.body)
-            scale_factor = 1.0 - (i / body_length) * 0.5  # От 1.0 до 0.5
-            segment_size = int(CELL_SIZE * scale_factor)
-            offset = (CELL_SIZE - segment_size) // 2
-            
-            # Основной цвет с затемнением для тела
+            # Рисуем по сетке (голову и хвост между ходами — на пути между клетками)
+            if alpha < 1 and i == 0:
+                x, y = cell_between(segment, head_from, alpha)
+            elif alpha < 1 and i == body_length - 1:
+                x, y = cell_between(segment, tail_from, alpha)
+            else:
+                x = (segment[0] // CELL_SIZE) * CELL_SIZE
+                y = (segment[1] // CELL_SIZE) * CELL_SIZE
             if i == 0:
-                # Голова - ярче
-                color = self.color
-                # Рисуем обводку
-                pygame.draw.rect(screen, (0, 0, 0), (x, y, CELL_SIZE, CELL_SIZE), 2)
-                # Основной прямоугольник
-                pygame.draw.rect(screen, color, (x + 2, y + 2, CELL_SIZE - 4, CELL_SIZE - 4))
-                # Блик
-                highlight_color = tuple(min(255, c + 60) for c in color)
-                pygame.draw.rect(screen, highlight_color, (x + 4, y + 4, CELL_SIZE // 3, CELL_SIZE // 3))
-                # Глаза
-                eye_color = (255, 255, 255)
-                pygame.draw.circle(screen, eye_color, (x + 6, y + 8), 3)
-                pygame.draw.circle(screen, eye_color, (x + CELL_SIZE - 6, y + 8), 3)
-                pygame.draw.circle(screen, (0, 0, 0), (x + 6, y + 8), 1)
-                pygame.draw.circle(screen, (0, 0, 0), (x + CELL_SIZE - 6, y + 8), 1)
+                # Голова - ярче, глазами по направлению движения
+                head = (SPRITES.head(head_color, self.direction), (x, y))
             else:
                 # Тело - темнее и сужается
-                color = tuple(max(0, c - 30) for c in self.color)
-                # Обводка
-                pygame.draw.rect(screen, (0, 0, 0), (x + offset, y + offset, segment_size, segment_size), 1)
-                # Основной прямоугольник со скругленными углами
-                pygame.draw.rect(screen, color, (x + offset + 1, y + offset + 1, segment_size - 2, segment_size - 2), border_radius=4)
-                # Небольшой блик (только если сегмент достаточно большой)
-                if segment_size > 10:
-                    highlight_color = tuple(min(255, c + 30) for c in color)
-                    highlight_size = max(2, segment_size // 4)
-                    pygame.draw.rect(screen, highlight_color, (x + offset + 3, y + offset + 3, highlight_size, highlight_size), border_radius=2)
+                segment_size = int(CELL_SIZE * (1.0 - (i / body_length) * 0.5))
+                offset = (CELL_SIZE - segment_size) // 2
+                segments.append((SPRITES.body(body_color, segment_size), (x + offset, y + offset)))
+        return head, segments
+
+    def draw(self, screen, alpha=1.0):
+        """Рисует змею; возвращает нарисованные спрайты (для вывода на экран только изменений)"""
+        head, segments = self.sprites(alpha)
+        # Голова поверх тела: между ходами она выезжает из клетки шеи
+        screen.blits(segments, doreturn=False)
+        if head is not None:
+            screen.blit(*head)
+        return segments if head is None else segments + [head]
 
 import pygame
-import random
 import os
 import asyncio
 import sys
 import json
+from functools import lru_cache
 from pathlib import Path
 
 # Проверяем, запущено ли в браузере
 RUNNING_IN_BROWSER = sys.platform == "emscripten"
 
-# Настройки игры
-WIDTH = 600
-HEIGHT = 600
-CELL_SIZE = 20
+# Настройки игры (WIDTH, HEIGHT и CELL_SIZE общие с ядром симуляции)
 FPS = 60
-FOOD_TYPES = ['normal', 'gold']
+# Сколько тиков симуляции можно догнать за один кадр: при долгом кадре остаток отбрасывается,
+# и игра на миг замедляется вместо того, чтобы копить отставание
+MAX_CATCH_UP_TICKS = 5
+# Неподвижные экраны (меню, итоги) перерисовываются по вводу, а без него — не чаще IDLE_FPS раз в секунду
+IDLE_FPS = 10
+# Как кадры соотносятся с тиками (настройка 'render_mode'): 'interpolate' — каждый кадр, змеи плавно
+# ползут между клетками; 'on-change' — кадр рисуется, только если что-то поменялось (тик, ввод,
+# анимация); 'every-frame' — каждый кадр, змеи стоят в клетках до следующего хода
+RENDER_MODES = ('interpolate', 'on-change', 'every-frame')
 
 # Цвета
 BLACK = (0, 0, 0)
@@ -157,9 +93,238 @@ THEMES = {
     'sunset': {'background': (40, 20, 0), 'grid': (100, 50, 0)}
 }
 
+
+class SpriteAtlas:
+    # Готовые спрайты змей и еды: голова по цвету и направлению, сегмент тела по цвету и размеру
+    # сужения, яблоко по типу. Каждый рисуется примитивами один раз (при первом обращении,
+    # warm — заранее для цветов змей игры), дальше кадр только копирует их на экран
+    HEAD_ANGLES = {UP: 0, LEFT: 90, DOWN: 180, RIGHT: -90}
+
+    def __init__(self):
+        self.heads = {}
+        self.bodies = {}
+        self.foods = {}
+
+    def warm(self, colors):
+        """Рисует заранее спрайты обычного вида змей этих цветов"""
+        for color in colors:
+            darker = tuple(max(0, c - 30) for c in color)
+            for direction in self.HEAD_ANGLES:
+                self.head(color, direction)
+            for size in range(CELL_SIZE // 2, CELL_SIZE + 1):
+                self.body(darker, size)
+        for food_type in ('normal', 'gold'):
+            self.food(food_type)
+
+    def head(self, color, direction):
+        sprite = self.heads.get((color, direction))
+        if sprite is not None:
+            return sprite
+        # Рисуем голову глазами вверх и поворачиваем по направлению
+        sprite = pygame.Surface((CELL_SIZE, CELL_SIZE)).convert()
+        # Рисуем обводку
+        pygame.draw.rect(sprite, (0, 0, 0), (0, 0, CELL_SIZE, CELL_SIZE), 2)
+        # Основной прямоугольник
+        pygame.draw.rect(sprite, color, (2, 2, CELL_SIZE - 4, CELL_SIZE - 4))
+        # Блик
+        highlight_color = tuple(min(255, c + 60) for c in color)
+        pygame.draw.rect(sprite, highlight_color, (4, 4, CELL_SIZE // 3, CELL_SIZE // 3))
+        # Глаза
+        eye_color = (255, 255, 255)
+        pygame.draw.circle(sprite, eye_color, (6, 8), 3)
+        pygame.draw.circle(sprite, eye_color, (CELL_SIZE - 6, 8), 3)
+        pygame.draw.circle(sprite, (0, 0, 0), (6, 8), 1)
+        pygame.draw.circle(sprite, (0, 0, 0), (CELL_SIZE - 6, 8), 1)
+        angle = self.HEAD_ANGLES.get(direction, 0)
+        if angle:
+            sprite = pygame.transform.rotate(sprite, angle)
+        self.heads[(color, direction)] = sprite
+        return sprite
+
+    def body(self, color, size):
+        sprite = self.bodies.get((color, size))
+        if sprite is not None:
+            return sprite
+        sprite = pygame.Surface((size, size), pygame.SRCALPHA).convert_alpha()
+        # Обводка
+        pygame.draw.rect(sprite, (0, 0, 0), (0, 0, size, size), 1)
+        # Основной прямоугольник со скругленными углами
+        pygame.draw.rect(sprite, color, (1, 1, size - 2, size - 2), border_radius=4)
+        # Небольшой блик (только если сегмент достаточно большой)
+        if size > 10:
+            highlight_color = tuple(min(255, c + 30) for c in color)
+            highlight_size = max(2, size // 4)
+            pygame.draw.rect(sprite, highlight_color, (3, 3, highlight_size, highlight_size), border_radius=2)
+        self.bodies[(color, size)] = sprite
+        return sprite
+
+    def food(self, food_type):
+        sprite = self.foods.get(food_type)
+        if sprite is not None:
+            return sprite
+        if food_type == 'gold':
+            # Золотое яблоко
+            food_color = GOLD
+            darker_color = (200, 170, 0)
+        else:
+            # Красное яблоко
+            food_color = RED
+            darker_color = (180, 0, 0)
+        # Тень выходит за клетку вниз, поэтому спрайт чуть больше клетки
+        sprite = pygame.Surface((CELL_SIZE + 4, CELL_SIZE + 4), pygame.SRCALPHA).convert_alpha()
+        # Тень
+        shadow_color = (50, 50, 50)
+        pygame.draw.circle(sprite, shadow_color, (CELL_SIZE // 2 + 2, CELL_SIZE - 3), CELL_SIZE // 3)
+        # Основное яблоко (круг) с градиентом
+        pygame.draw.circle(sprite, darker_color, (CELL_SIZE // 2 + 1, CELL_SIZE // 2 + 1), CELL_SIZE // 2 - 2)
+        pygame.draw.circle(sprite, food_color, (CELL_SIZE // 2, CELL_SIZE // 2), CELL_SIZE // 2 - 2)
+        # Темная обводка
+        pygame.draw.circle(sprite, (0, 0, 0), (CELL_SIZE // 2, CELL_SIZE // 2), CELL_SIZE // 2 - 2, 2)
+        # Блик
+        highlight_color = (255, 255, 255)
+        pygame.draw.circle(sprite, highlight_color, (CELL_SIZE // 2 - 3, CELL_SIZE // 2 - 4), 4)
+        # Листик
+        leaf_color = (0, 150, 0)
+        leaf_points = [
+            (CELL_SIZE // 2, 3),
+            (CELL_SIZE // 2 + 5, 0),
+            (CELL_SIZE // 2 + 3, 6)
+        ]
+        pygame.draw.polygon(sprite, leaf_color, leaf_points)
+        self.foods[food_type] = sprite
+        return sprite
+
+
+SPRITES = SpriteAtlas()
+
+
+class SurfacePool:
+    # Рабочие поверхности по (размер, флаги) для того, что рисуется каждый кадр заново:
+    # затемнения меню и обратного отсчета на все окно. Без пула это новая поверхность в несколько
+    # мегабайт на каждый кадр. Поверхность общая — взявший заполняет ее и сразу рисует
+    def __init__(self, limit=16):
+        self.limit = limit
+        self.surfaces = {}
+
+    def get(self, size, flags=0):
+        key = (tuple(size), flags)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            if len(self.surfaces) >= self.limit:
+                # Размеры окна, которых уже нет, — первыми
+                del self.surfaces[next(iter(self.surfaces))]
+            surface = self.surfaces[key] = pygame.Surface(size, flags)
+        return surface
+
+
+SURFACES = SurfacePool()
+
+
+class WindowState:
+    # Свернуто ли окно и в фокусе ли оно — по событиям окна, которые циклы событий передают в observe
+    def __init__(self):
+        self.focused = True
+        self.minimized = False
+
+    def observe(self, event):
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.focused = True
+        elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+            self.minimized = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWMAXIMIZED):
+            self.minimized = False
+
+    def asleep(self):
+        """Окно свернуто или без фокуса — кадры никто не видит"""
+        return self.minimized or not self.focused
+
+
+WINDOW = WindowState()
+
+
+async def idle_wait(fps=IDLE_FPS):
+    """Пауза между кадрами неподвижного экрана: до события ввода, но не дольше 1/fps секунды.
+    Пока окно свернуто или без фокуса — до события, которое его вернет, или до закрытия окна.
+    Событие, на котором проснулись, остается в очереди для цикла событий"""
+    await asyncio.sleep(0)
+    if RUNNING_IN_BROWSER:
+        # В браузере блокирующее ожидание событий остановило бы страницу
+        await asyncio.sleep(1 / fps)
+        return
+    if WINDOW.asleep():
+        woke = []
+        while WINDOW.asleep():
+            event = pygame.event.wait()
+            WINDOW.observe(event)
+            if event.type != pygame.MOUSEMOTION:
+                woke.append(event)
+            if event.type == pygame.QUIT:
+                break
+        for event in woke:
+            pygame.event.post(event)
+        return
+    deadline = pygame.time.get_ticks() + 1000 // fps
+    while True:
+        remaining = deadline - pygame.time.get_ticks()
+        if remaining <= 0:
+            return
+        event = pygame.event.wait(remaining)
+        if event.type == pygame.NOEVENT:
+            return
+        # Движение мыши никто не обрабатывает — ждем дальше
+        if event.type != pygame.MOUSEMOTION:
+            pygame.event.post(event)
+            return
+
+# Шрифты по (имя, размер). SysFont ищет шрифт среди системных — на машине с большим числом
+# шрифтов это заметная пауза, поэтому каждый шрифт создается один раз на процесс
+FONTS = {}
+# Сколько готовых надписей держит кэш render_text
+TEXT_CACHE_SIZE = 512
+
+
+def get_font(size, name=None):
+    """Шрифт из реестра: создается при первом обращении"""
+    font = FONTS.get((name, size))
+    if font is None:
+        font = FONTS[(name, size)] = pygame.font.SysFont(name, size)
+    return font
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def render_text(font, text, color, antialias=True):
+    """Надпись, отрисованная шрифтом; одинаковый текст рисуется заново, только когда выпал из кэша
+    (счет — только когда поменялось значение). Поверхность общая — менять ее нельзя"""
+    return font.render(text, antialias, color)
+
+
+def cell_between(cell, previous, alpha):
+    """Левый верхний угол сегмента, прошедшего долю alpha пути из клетки previous в клетку cell.
+    Из несоседней клетки (телепорт через край) — сразу в cell"""
+    x = (cell[0] // CELL_SIZE) * CELL_SIZE
+    y = (cell[1] // CELL_SIZE) * CELL_SIZE
+    from_x = (previous[0] // CELL_SIZE) * CELL_SIZE
+    from_y = (previous[1] // CELL_SIZE) * CELL_SIZE
+    if abs(x - from_x) + abs(y - from_y) > CELL_SIZE:
+        return x, y
+    return from_x + round((x - from_x) * alpha), from_y + round((y - from_y) * alpha)
+
+
+def changed_rects(previous, current):
+    """Прямоугольники, где кадр отличается от прошлого: спрайты, что исчезли, появились или
+    сменили вид. Кадры — списки (ключ, поверхность, позиция); у готовых спрайтов ключ — сама поверхность"""
+    before = {(key, pos) for key, _, pos in previous}
+    after = {(key, pos) for key, _, pos in current}
+    rects = [surface.get_rect(topleft=pos) for key, surface, pos in previous if (key, pos) not in after]
+    rects.extend(surface.get_rect(topleft=pos) for key, surface, pos in current if (key, pos) not in before)
+    return rects
+
 # Настройки
 SETTINGS_FILE = Path.home() / '.snake_game_settings.json'
 LEADERBOARD_FILE = Path.home() / '.snake_game_leaderboard.json'
+REPLAY_DIR = Path.home() / '.snake_game_replays'
 
 def load_settings():
     try:
@@ -204,6 +369,16 @@ def add_score_to_leaderboard(name, score):
     leaderboard.sort(key=lambda x: x['score'], reverse=True)
     save_leaderboard(leaderboard[:10])
 
+def save_replay(replay):
+    # Повтор занимает пару байт на тик, поэтому сохраняем каждую сыгранную игру
+    try:
+        from datetime import datetime
+        REPLAY_DIR.mkdir(exist_ok=True)
+        name = datetime.now().strftime('%Y%m%d-%H%M%S') + f"-{replay.header['seed']}.snkr"
+        (REPLAY_DIR / name).write_bytes(replay.to_bytes())
+    except:
+        pass
+
 # Звуковые эффекты
 def play_sound(sound_type):
     settings = load_settings()
@@ -233,8 +408,8 @@ def play_sound(sound_type):
 class Menu:
     def __init__(self, screen):
         self.screen = screen
-        self.font = pygame.font.SysFont(None, 48)
-        self.small_font = pygame.font.SysFont(None, 36)
+        self.font = get_font(48)
+        self.small_font = get_font(36)
         self.levels = [
             {"name": "Easy", "delay": 200},
             {"name": "Medium", "delay": 100},
@@ -273,6 +448,10 @@ class Menu:
         self.controls_p2 = self.default_controls_p2.copy()
         self.waiting_for_key = None  # ('p1', 'up'), ('p2', 'down'), etc.
         self.fullscreen = False
+        # Вывод на экран: целиком после ввода и смены размера, иначе только клетки фоновой игры
+        self.full_flip = True
+        self.flipped_size = None
+        self.background_sprites = []
 
     def draw(self):
         # Получаем текущий размер окна
@@ -282,62 +461,49 @@ class Menu:
         self.screen.fill(BLACK)
         
         # Отрисовываем фоновую игру
-        if self.background_game is None or not any(s.alive for s in self.background_game.snakes):
+        if self.background_game is None or self.background_game.game_over:
             # Создаём новую фоновую игру с одним ботом
             bg_game = SnakeGame(100, GREEN, mode='single', walls_type='No walls', theme='classic', settings=self.settings)
             bg_game.screen = self.screen
+            bg_game.replay = None  # Демо в меню не сохраняется — и записывать его ввод незачем
             # Делаем змею ботом
             bg_game.snakes[0].is_bot = True
             bg_game.snakes[0].controls = {}
+            # Демо-бот ходит по гамильтонову циклу: не погибает и доходит до заполненного поля
+            bg_game.bot_strategy = 'hamiltonian'
             self.background_game = bg_game
             self.bg_last_move = pygame.time.get_ticks()
         
         # Обновляем фоновую игру
         current_time = pygame.time.get_ticks()
         if current_time - self.bg_last_move > 100:
-            self.background_game.move()
+            self.background_game.move(current_time)  # Передаем current_time для бота
             self.bg_last_move = current_time
         
         # Рисуем только змей и еду без UI (без score)
+        background_sprites = []
         for snake in self.background_game.snakes:
             if snake.alive:
-                snake.draw(self.screen)
+                background_sprites.extend((sprite, sprite, pos) for sprite, pos in snake.draw(self.screen))
         
-        # Рисуем еду
-        fx, fy = self.background_game.food['pos']
-        if self.background_game.food['type'] == 'gold':
-            food_color = GOLD
-            darker_gold = (200, 170, 0)
-        else:
-            food_color = RED
-            darker_gold = (180, 0, 0)
-        
-        shadow_color = (50, 50, 50)
-        pygame.draw.circle(self.screen, shadow_color, (fx + CELL_SIZE // 2 + 2, fy + CELL_SIZE - 3), CELL_SIZE // 3)
-        pygame.draw.circle(self.screen, darker_gold, (fx + CELL_SIZE // 2 + 1, fy + CELL_SIZE // 2 + 1), CELL_SIZE // 2 - 2)
-        pygame.draw.circle(self.screen, food_color, (fx + CELL_SIZE // 2, fy + CELL_SIZE // 2), CELL_SIZE // 2 - 2)
-        pygame.draw.circle(self.screen, (0, 0, 0), (fx + CELL_SIZE // 2, fy + CELL_SIZE // 2), CELL_SIZE // 2 - 2, 2)
-        highlight_color = (255, 255, 255)
-        pygame.draw.circle(self.screen, highlight_color, (fx + CELL_SIZE // 2 - 3, fy + CELL_SIZE // 2 - 4), 4)
-        leaf_color = (0, 150, 0)
-        leaf_points = [
-            (fx + CELL_SIZE // 2, fy + 3),
-            (fx + CELL_SIZE // 2 + 5, fy),
-            (fx + CELL_SIZE // 2 + 3, fy + 6)
-        ]
-        pygame.draw.polygon(self.screen, leaf_color, leaf_points)
+        # Рисуем еду (когда поле заполнено целиком, еды нет)
+        if self.background_game.food is not None:
+            fx, fy = self.background_game.food['pos']
+            sprite = SPRITES.food(self.background_game.food['type'])
+            self.screen.blit(sprite, (fx, fy))
+            background_sprites.append((sprite, sprite, (fx, fy)))
         
         # Затемняем фон
-        overlay = pygame.Surface((self.screen.get_width(), self.screen.get_height()))
+        overlay = SURFACES.get(self.screen.get_size())
         overlay.set_alpha(200)
         overlay.fill(BLACK)
         self.screen.blit(overlay, (0, 0))
         
         # High Score в левом верхнем углу
-        score_font = pygame.font.SysFont(None, 36)
+        score_font = get_font(36)
         leaderboard = load_leaderboard()
         high_score = leaderboard[0]['score'] if leaderboard else 0
-        high_score_text = score_font.render(f"High Score: {high_score}", True, GOLD)
+        high_score_text = render_text(score_font, f"High Score: {high_score}", GOLD)
         self.screen.blit(high_score_text, (10, 10))
         
         # Сохраняем прямоугольники для кликабельных элементов
@@ -387,13 +553,13 @@ class Menu:
             pygame.draw.lines(self.screen, RED, False, tongue_points, 2)
             
             # Заголовок с эффектом тени
-            title_font = pygame.font.SysFont(None, 72)
+            title_font = get_font(72)
             # Тень
-            title_shadow = title_font.render("SUPER SNAKE GAME", True, (0, 100, 0))
+            title_shadow = render_text(title_font, "SUPER SNAKE GAME", (0, 100, 0))
             shadow_rect = title_shadow.get_rect(center=(center_x + 3, center_y - 77))
             self.screen.blit(title_shadow, shadow_rect)
             # Основной текст
-            title = title_font.render("SUPER SNAKE GAME", True, GREEN)
+            title = render_text(title_font, "SUPER SNAKE GAME", GREEN)
             title_rect = title.get_rect(center=(center_x, center_y - 80))
             self.screen.blit(title, title_rect)
             
@@ -423,7 +589,7 @@ class Menu:
             # Кнопка Start
             start_button = pygame.Rect(center_x - 100, center_y + 20, 200, 60)
             pygame.draw.rect(self.screen, GREEN, start_button)
-            start_text = self.font.render("Start", True, BLACK)
+            start_text = render_text(self.font, "Start", BLACK)
             start_text_rect = start_text.get_rect(center=start_button.center)
             self.screen.blit(start_text, start_text_rect)
             self.clickable_rects.append(('start', start_button))
@@ -431,14 +597,14 @@ class Menu:
             # Кнопка Exit
             exit_button = pygame.Rect(center_x - 100, center_y + 90, 200, 50)
             pygame.draw.rect(self.screen, RED, exit_button)
-            exit_text = self.small_font.render("Exit", True, BLACK)
+            exit_text = render_text(self.small_font, "Exit", BLACK)
             exit_text_rect = exit_text.get_rect(center=exit_button.center)
             self.screen.blit(exit_text, exit_text_rect)
             self.clickable_rects.append(('exit', exit_button))
             
             # Текстовые подсказки
-            subtitle_font = pygame.font.SysFont(None, 28)
-            settings_text = subtitle_font.render("Press C to configure controls", True, GRAY)
+            subtitle_font = get_font(28)
+            settings_text = render_text(subtitle_font, "Press C to configure controls", GRAY)
             settings_rect = settings_text.get_rect(center=(center_x, center_y + 150))
             self.screen.blit(settings_text, settings_rect)
             
@@ -446,14 +612,14 @@ class Menu:
             settings_button = pygame.Rect(center_x - 150, center_y + 180, 130, 45)
             pygame.draw.rect(self.screen, (80, 80, 80), settings_button)
             pygame.draw.rect(self.screen, GRAY, settings_button, 2)
-            settings_txt = self.small_font.render("⚙️ Settings", True, WHITE)
+            settings_txt = render_text(self.small_font, "⚙️ Settings", WHITE)
             self.screen.blit(settings_txt, settings_txt.get_rect(center=settings_button.center))
             self.clickable_rects.append(('settings', settings_button))
             
             leader_button = pygame.Rect(center_x + 20, center_y + 180, 130, 45)
             pygame.draw.rect(self.screen, (100, 80, 0), leader_button)
             pygame.draw.rect(self.screen, GOLD, leader_button, 2)
-            leader_txt = self.small_font.render("🏆 Records", True, GOLD)
+            leader_txt = render_text(self.small_font, "🏆 Records", GOLD)
             self.screen.blit(leader_txt, leader_txt.get_rect(center=leader_button.center))
             self.clickable_rects.append(('leaderboard', leader_button))
             
@@ -461,101 +627,101 @@ class Menu:
             rules_button = pygame.Rect(center_x - 65, center_y + 235, 130, 45)
             pygame.draw.rect(self.screen, (60, 60, 100), rules_button)
             pygame.draw.rect(self.screen, (100, 100, 200), rules_button, 2)
-            rules_txt = self.small_font.render("📖 Rules", True, WHITE)
+            rules_txt = render_text(self.small_font, "📖 Rules", WHITE)
             self.screen.blit(rules_txt, rules_txt.get_rect(center=rules_button.center))
             self.clickable_rects.append(('rules', rules_button))
             
             # Подзаголовок (под кнопками)
-            subtitle = subtitle_font.render("Press ENTER to start", True, WHITE)
+            subtitle = render_text(subtitle_font, "Press ENTER to start", WHITE)
             subtitle_rect = subtitle.get_rect(center=(center_x, center_y + 295))
             self.screen.blit(subtitle, subtitle_rect)
         elif self.step == 'mode':
-            title = self.font.render("Choose Game Mode", True, WHITE)
+            title = render_text(self.font, "Choose Game Mode", WHITE)
             self.screen.blit(title, (center_x - 170, center_y - 100))
             for i, mode in enumerate(self.modes):
                 color = GREEN if i == self.selected else WHITE
-                text = self.small_font.render(f"{i+1}. {mode}", True, color)
+                text = render_text(self.small_font, f"{i+1}. {mode}", color)
                 text_rect = pygame.Rect(center_x - 100, center_y - 50 + i * 40, 200, 35)
                 self.screen.blit(text, (center_x - 80, center_y - 50 + i * 40))
                 self.clickable_rects.append(('mode', i, text_rect))
         elif self.step == 'walls':
-            title = self.font.render("Choose Walls", True, WHITE)
+            title = render_text(self.font, "Choose Walls", WHITE)
             self.screen.blit(title, (center_x - 120, center_y - 100))
             for i, wtype in enumerate(self.walls_types):
                 color = GREEN if i == self.selected else WHITE
-                text = self.small_font.render(f"{i+1}. {wtype}", True, color)
+                text = render_text(self.small_font, f"{i+1}. {wtype}", color)
                 text_rect = pygame.Rect(center_x - 100, center_y - 50 + i * 40, 200, 35)
                 self.screen.blit(text, (center_x - 80, center_y - 50 + i * 40))
                 self.clickable_rects.append(('walls', i, text_rect))
         elif self.step == 'level':
-            title = self.font.render("Choose Level", True, WHITE)
+            title = render_text(self.font, "Choose Level", WHITE)
             self.screen.blit(title, (center_x - 120, center_y - 100))
             for i, level in enumerate(self.levels):
                 color = GREEN if i == self.selected else WHITE
-                text = self.small_font.render(f"{i+1}. {level['name']}", True, color)
+                text = render_text(self.small_font, f"{i+1}. {level['name']}", color)
                 text_rect = pygame.Rect(center_x - 100, center_y - 50 + i * 40, 200, 35)
                 self.screen.blit(text, (center_x - 80, center_y - 50 + i * 40))
                 self.clickable_rects.append(('level', i, text_rect))
         elif self.step == 'color':
-            title = self.font.render("Choose Snake Color", True, WHITE)
+            title = render_text(self.font, "Choose Snake Color", WHITE)
             self.screen.blit(title, (center_x - 150, center_y - 100))
             for i, color_name in enumerate(self.color_names):
                 color = GREEN if i == self.selected else WHITE
-                text = self.small_font.render(f"{i+1}. {color_name}", True, color)
+                text = render_text(self.small_font, f"{i+1}. {color_name}", color)
                 text_rect = pygame.Rect(center_x - 100, center_y - 50 + i * 40, 200, 35)
                 self.screen.blit(text, (center_x - 80, center_y - 50 + i * 40))
                 self.clickable_rects.append(('color', i, text_rect))
         elif self.step == 'controls':
-            title = self.font.render("Configure Controls", True, WHITE)
+            title = render_text(self.font, "Configure Controls", WHITE)
             title_rect = title.get_rect(center=(center_x, center_y - 200))
             self.screen.blit(title, title_rect)
             
             # Player 1 controls
-            p1_title = self.small_font.render("Player 1:", True, GREEN)
+            p1_title = render_text(self.small_font, "Player 1:", GREEN)
             self.screen.blit(p1_title, (center_x - 250, center_y - 140))
             
             directions = [('up', 'Up'), ('down', 'Down'), ('left', 'Left'), ('right', 'Right'), ('speedup', 'Speedup')]
             for idx, (dir_key, dir_name) in enumerate(directions):
                 key_name = pygame.key.name(self.controls_p1[dir_key])
                 color = RED if self.waiting_for_key == ('p1', dir_key) else WHITE
-                text = self.small_font.render(f"{dir_name}: {key_name}", True, color)
+                text = render_text(self.small_font, f"{dir_name}: {key_name}", color)
                 button_rect = pygame.Rect(center_x - 250, center_y - 100 + idx * 35, 200, 30)
                 pygame.draw.rect(self.screen, GRAY, button_rect, 2)
                 self.screen.blit(text, (center_x - 240, center_y - 95 + idx * 35))
                 self.clickable_rects.append(('control', 'p1', dir_key, button_rect))
             
             # Player 2 controls
-            p2_title = self.small_font.render("Player 2:", True, BLUE)
+            p2_title = render_text(self.small_font, "Player 2:", BLUE)
             self.screen.blit(p2_title, (center_x + 50, center_y - 140))
             
             for idx, (dir_key, dir_name) in enumerate(directions):
                 key_name = pygame.key.name(self.controls_p2[dir_key])
                 color = RED if self.waiting_for_key == ('p2', dir_key) else WHITE
-                text = self.small_font.render(f"{dir_name}: {key_name}", True, color)
+                text = render_text(self.small_font, f"{dir_name}: {key_name}", color)
                 button_rect = pygame.Rect(center_x + 50, center_y - 100 + idx * 35, 200, 30)
                 pygame.draw.rect(self.screen, GRAY, button_rect, 2)
                 self.screen.blit(text, (center_x + 60, center_y - 95 + idx * 35))
                 self.clickable_rects.append(('control', 'p2', dir_key, button_rect))
             
             # Инструкции
-            inst_font = pygame.font.SysFont(None, 28)
+            inst_font = get_font(28)
             if self.waiting_for_key:
-                inst_text = inst_font.render("Press any key to assign...", True, GOLD)
+                inst_text = render_text(inst_font, "Press any key to assign...", GOLD)
             else:
-                inst_text = inst_font.render("Click on a control to change it", True, WHITE)
+                inst_text = render_text(inst_font, "Click on a control to change it", WHITE)
             inst_rect = inst_text.get_rect(center=(center_x, center_y + 90))
             self.screen.blit(inst_text, inst_rect)
             
-            reset_text = inst_font.render("Press R to reset to defaults", True, GRAY)
+            reset_text = render_text(inst_font, "Press R to reset to defaults", GRAY)
             reset_rect = reset_text.get_rect(center=(center_x, center_y + 120))
             self.screen.blit(reset_text, reset_rect)
             
-            back_text = inst_font.render("Press ESC or BACKSPACE to go back", True, GRAY)
+            back_text = render_text(inst_font, "Press ESC or BACKSPACE to go back", GRAY)
             back_rect = back_text.get_rect(center=(center_x, center_y + 150))
             self.screen.blit(back_text, back_rect)
         elif self.step == 'settings':
             # Main title with decorative line
-            title = self.font.render("SETTINGS", True, GOLD)
+            title = render_text(self.font, "SETTINGS", GOLD)
             title_rect = title.get_rect(center=(center_x, center_y - 240))
             self.screen.blit(title, title_rect)
             
@@ -563,8 +729,8 @@ class Menu:
             pygame.draw.line(self.screen, GOLD, (center_x - 150, center_y - 215), (center_x + 150, center_y - 215), 2)
             
             # === VISUAL SECTION ===
-            section_font = pygame.font.SysFont(None, 32)
-            visual_section = section_font.render("VISUAL", True, WHITE)
+            section_font = get_font(32)
+            visual_section = render_text(section_font, "VISUAL", WHITE)
             self.screen.blit(visual_section, (center_x - 280, center_y - 180))
             pygame.draw.line(self.screen, WHITE, (center_x - 280, center_y - 155), (center_x - 50, center_y - 155), 1)
             
@@ -607,16 +773,16 @@ class Menu:
                 display_name = theme_names.get(theme_name, theme_name.title())
                 name_parts = display_name.split()
                 if len(name_parts) > 1:
-                    text = self.small_font.render(name_parts[1], True, text_color)
+                    text = render_text(self.small_font, name_parts[1], text_color)
                 else:
-                    text = self.small_font.render(display_name, True, text_color)
+                    text = render_text(self.small_font, display_name, text_color)
                 text_rect = text.get_rect(center=(x_pos + 65, y_pos + 21))
                 self.screen.blit(text, text_rect)
                 
                 self.clickable_rects.append(('theme', theme_name, button_rect))
             
             # === AUDIO SECTION ===
-            audio_section = section_font.render("AUDIO", True, WHITE)
+            audio_section = render_text(section_font, "AUDIO", WHITE)
             self.screen.blit(audio_section, (center_x + 50, center_y - 180))
             pygame.draw.line(self.screen, WHITE, (center_x + 50, center_y - 155), (center_x + 280, center_y - 155), 1)
             
@@ -639,33 +805,33 @@ class Menu:
                 icon = "♪"
             
             # Sound icon
-            icon_font = pygame.font.SysFont(None, 48)
-            icon_text = icon_font.render(icon, True, status_color)
+            icon_font = get_font(48)
+            icon_text = render_text(icon_font, icon, status_color)
             self.screen.blit(icon_text, (center_x + 65, center_y - 117))
             
             # Label and status
-            label_font = pygame.font.SysFont(None, 28)
-            label = label_font.render("Sound Effects", True, status_color)
+            label_font = get_font(28)
+            label = render_text(label_font, "Sound Effects", status_color)
             self.screen.blit(label, (center_x + 105, center_y - 120))
             
-            status_font = pygame.font.SysFont(None, 36)
-            status = status_font.render(status_text, True, status_color)
+            status_font = get_font(36)
+            status = render_text(status_font, status_text, status_color)
             self.screen.blit(status, (center_x + 105, center_y - 92))
             
             self.clickable_rects.append(('sound_toggle', sound_button))
             
             # === CONTROLS SECTION ===
-            controls_section = section_font.render("CONTROLS", True, WHITE)
+            controls_section = render_text(section_font, "CONTROLS", WHITE)
             self.screen.blit(controls_section, (center_x + 50, center_y - 35))
             pygame.draw.line(self.screen, WHITE, (center_x + 50, center_y - 10), (center_x + 280, center_y - 10), 1)
             
             # Controls info button
-            controls_info = self.small_font.render("Press C in-game to customize", True, GRAY)
+            controls_info = render_text(self.small_font, "Press C in-game to customize", GRAY)
             self.screen.blit(controls_info, (center_x + 50, center_y + 15))
             
             # === BOTTOM INFO ===
-            hint_font = pygame.font.SysFont(None, 24)
-            hint = hint_font.render("Click on any option to change it", True, (120, 120, 120))
+            hint_font = get_font(24)
+            hint = render_text(hint_font, "Click on any option to change it", (120, 120, 120))
             hint_rect = hint.get_rect(center=(center_x, center_y + 120))
             self.screen.blit(hint, hint_rect)
             
@@ -673,13 +839,13 @@ class Menu:
             back_button = pygame.Rect(center_x - 100, center_y + 160, 200, 50)
             pygame.draw.rect(self.screen, (60, 60, 60), back_button, border_radius=8)
             pygame.draw.rect(self.screen, (120, 120, 120), back_button, 2, border_radius=8)
-            back_text = self.small_font.render("← Back to Menu", True, WHITE)
+            back_text = render_text(self.small_font, "← Back to Menu", WHITE)
             self.screen.blit(back_text, back_text.get_rect(center=back_button.center))
             self.clickable_rects.append(('back_to_menu', back_button))
             
         elif self.step == 'rules':
             # Title
-            title = self.font.render("HOW TO PLAY", True, GOLD)
+            title = render_text(self.font, "HOW TO PLAY", GOLD)
             title_rect = title.get_rect(center=(center_x, center_y - 240))
             self.screen.blit(title, title_rect)
             
@@ -687,8 +853,8 @@ class Menu:
             pygame.draw.line(self.screen, GOLD, (center_x - 120, center_y - 215), (center_x + 120, center_y - 215), 2)
             
             # Rules text
-            rules_font = pygame.font.SysFont(None, 28)
-            small_font = pygame.font.SysFont(None, 24)
+            rules_font = get_font(28)
+            small_font = get_font(24)
             
             rules = [
                 ("OBJECTIVE", GOLD, rules_font),
@@ -714,7 +880,7 @@ class Menu:
             y_offset = center_y - 180
             for text, color, font in rules:
                 if text:
-                    rendered = font.render(text, True, color)
+                    rendered = render_text(font, text, color)
                     if font == rules_font:  # Section headers
                         rect = rendered.get_rect(center=(center_x, y_offset))
                     else:  # Regular text
@@ -726,12 +892,12 @@ class Menu:
             back_button = pygame.Rect(center_x - 100, center_y + 180, 200, 50)
             pygame.draw.rect(self.screen, (60, 60, 60), back_button, border_radius=8)
             pygame.draw.rect(self.screen, (120, 120, 120), back_button, 2, border_radius=8)
-            back_text = self.small_font.render("← Back to Menu", True, WHITE)
+            back_text = render_text(self.small_font, "← Back to Menu", WHITE)
             self.screen.blit(back_text, back_text.get_rect(center=back_button.center))
             self.clickable_rects.append(('back_to_menu', back_button))
             
         elif self.step == 'leaderboard':
-            title = self.font.render("Leaderboard", True, GOLD)
+            title = render_text(self.font, "Leaderboard", GOLD)
             title_rect = title.get_rect(center=(center_x, center_y - 200))
             self.screen.blit(title, title_rect)
             
@@ -739,38 +905,38 @@ class Menu:
             if leaderboard:
                 for i, entry in enumerate(leaderboard[:10]):
                     rank_color = GOLD if i == 0 else (GRAY if i < 3 else WHITE)
-                    text = self.small_font.render(
+                    text = render_text(
+                        self.small_font,
                         f"{i+1}. {entry['name']}: {entry['score']}", 
-                        True, 
                         rank_color
                     )
                     self.screen.blit(text, (center_x - 150, center_y - 150 + i * 30))
             else:
-                no_scores = self.small_font.render("No scores yet!", True, GRAY)
+                no_scores = render_text(self.small_font, "No scores yet!", GRAY)
                 self.screen.blit(no_scores, no_scores.get_rect(center=(center_x, center_y)))
             
             # Clear button
             clear_button = pygame.Rect(center_x - 220, center_y + 150, 120, 40)
             pygame.draw.rect(self.screen, RED, clear_button)
-            clear_text = self.small_font.render("Clear", True, WHITE)
+            clear_text = render_text(self.small_font, "Clear", WHITE)
             self.screen.blit(clear_text, clear_text.get_rect(center=clear_button.center))
             self.clickable_rects.append(('clear_leaderboard', clear_button))
             
             # Back button
             back_button = pygame.Rect(center_x + 100, center_y + 150, 120, 40)
             pygame.draw.rect(self.screen, GRAY, back_button)
-            back_text = self.small_font.render("Back", True, WHITE)
+            back_text = render_text(self.small_font, "Back", WHITE)
             self.screen.blit(back_text, back_text.get_rect(center=back_button.center))
             self.clickable_rects.append(('back_to_menu', back_button))
             
         # Кнопки увеличения/уменьшения размера окна (зум)
-        button_font = pygame.font.SysFont(None, 28)
+        button_font = get_font(28)
         plus_rect = pygame.Rect(self.screen.get_width() - 90, 10, 35, 35)
         minus_rect = pygame.Rect(self.screen.get_width() - 50, 10, 35, 35)
         pygame.draw.rect(self.screen, GRAY, plus_rect)
         pygame.draw.rect(self.screen, GRAY, minus_rect)
-        plus_text = button_font.render("+", True, BLACK)
-        minus_text = button_font.render("-", True, BLACK)
+        plus_text = render_text(button_font, "+", BLACK)
+        minus_text = render_text(button_font, "-", BLACK)
         self.screen.blit(plus_text, plus_rect.move(10, 2))
         self.screen.blit(minus_text, minus_rect.move(10, 2))
         # Обработка кликов по кнопкам
@@ -781,10 +947,25 @@ class Menu:
             elif minus_rect.collidepoint(event.pos):
                 pygame.display.set_mode((max(300, self.screen.get_width() - 100), max(300, self.screen.get_height() - 100)), pygame.RESIZABLE)
                 pygame.display.flip()
-        pygame.display.flip()
+        # Без ввода меню само не меняется — кроме фоновой игры: выводим на экран только ее клетки
+        size = self.screen.get_size()
+        if not self.settings.get('dirty_rects', True) or self.full_flip or size != self.flipped_size:
+            pygame.display.flip()
+            self.full_flip = False
+            self.flipped_size = size
+        else:
+            rects = changed_rects(self.background_sprites, background_sprites)
+            if rects:
+                pygame.display.update(rects)
+        self.background_sprites = background_sprites
 
     def handle_events(self):
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        if any(event.type != pygame.MOUSEMOTION for event in events):
+            # Ввод может поменять в меню что угодно — следующий кадр выводится целиком
+            self.full_flip = True
+        for event in events:
+            WINDOW.observe(event)
             if event.type == pygame.QUIT:
                 return None
             elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -959,6 +1140,7 @@ class Menu:
 
     async def run(self):
         self.step = 'start'
+        self.full_flip = True
         self.selected = 0
         self.selected_mode = 0
         self.selected_walls = 0
@@ -977,55 +1159,30 @@ class Menu:
                 continue
             elif isinstance(result, dict):
                 return result
-            await asyncio.sleep(0)
+            # Меню ждет ввода; фоновая игра ходит раз в 100 мс, ей хватает IDLE_FPS
+            await idle_wait()
+
+class SnakeGame(SnakeSimulation):
+    # Змеи игры рисуются через Snake.draw
+    snake_class = Snake
 
-class SnakeGame:
     def handle_zoom(self):
         # Обновить self.screen после изменения размера окна
         self.screen = pygame.display.get_surface()
-        self.regenerate_walls()
-        self.food = self.random_food()
+        self.background_cache = None
+        self.resize(self.screen.get_width(), self.screen.get_height())
 
     def regenerate_walls(self):
-        # Перегенерировать стены при изменении размера окна
-        self.walls = []
-        if self.walls_type == "With walls":
-            screen_w = (self.screen.get_width() // CELL_SIZE)
-            screen_h = (self.screen.get_height() // CELL_SIZE)
-            wall_count = 0
-            if self.move_delay >= 200:  # Easy
-                wall_count = 30
-            elif self.move_delay >= 100:  # Medium
-                wall_count = 60
-            else:  # Hard
-                wall_count = 120
-            forbidden = [
-                (screen_w // 2 * CELL_SIZE, screen_h // 2 * CELL_SIZE),
-                (screen_w // 4 * CELL_SIZE, screen_h // 2 * CELL_SIZE),
-                (3 * screen_w // 4 * CELL_SIZE, screen_h // 2 * CELL_SIZE)
-            ]
-            # Запрещаем стены в верхнем левом углу (где High Score и счета игроков)
-            for py in range(4):  # Первые 4 строки
-                for px in range(8):  # Первые 8 колонок
-                    forbidden.append((px * CELL_SIZE, py * CELL_SIZE))
-            
-            for _ in range(wall_count):
-                while True:
-                    x = random.randint(0, screen_w - 1) * CELL_SIZE
-                    y = random.randint(0, screen_h - 1) * CELL_SIZE
-                    if (x, y) not in forbidden and x != 0 and y != 0 and x != (screen_w-1)*CELL_SIZE and y != (screen_h-1)*CELL_SIZE:
-                        self.walls.append((x, y))
-                        break
-    def __init__(self, move_delay, snake_color, mode='single', bot_color=BLUE, walls_type="Frame walls", controls_p1=None, controls_p2=None, theme='classic', settings=None):
-        # Запретить совпадение цветов змеи и бота
-        if bot_color == snake_color:
-            alt_colors = [c for c in [GREEN, BLUE, RED, (255,255,0), (255,0,255), (0,255,255)] if c != snake_color]
-            bot_color = alt_colors[0]
-        self.move_delay = move_delay
-        self.snake_color = snake_color
-        self.mode = mode
-        self.bot_color = bot_color
-        
+        super().regenerate_walls()
+        # Стены нарисованы в кэше фона — он устарел
+        self.background_cache = None
+
+    def rebuild_grid(self):
+        super().rebuild_grid()
+        # Сменился размер поля (или стены при восстановлении снимка)
+        self.background_cache = None
+
+    def __init__(self, move_delay, snake_color, mode='single', bot_color=BLUE, walls_type="Frame walls", controls_p1=None, controls_p2=None, theme='classic', settings=None, seed=None):
         # Инициализация темы и настроек
         self.theme = theme if theme in THEMES else 'classic'
         self.theme_colors = THEMES[self.theme]
@@ -1034,38 +1191,6 @@ class SnakeGame:
         pygame.display.set_caption("Snake Game")
         self.clock = pygame.time.Clock()
         self.screen = None
-        # Генерация стен: случайно по всему полю, не по периметру, с учетом размера окна
-        self.walls = []
-        if walls_type == "With walls":
-            # Получаем размер окна
-            screen_w = (pygame.display.get_surface().get_width() // CELL_SIZE)
-            screen_h = (pygame.display.get_surface().get_height() // CELL_SIZE)
-            wall_count = 0
-            if self.move_delay >= 200:  # Easy
-                wall_count = 30
-            elif self.move_delay >= 100:  # Medium
-                wall_count = 60
-            else:  # Hard
-                wall_count = 120
-            forbidden = [
-                (screen_w // 2 * CELL_SIZE, screen_h // 2 * CELL_SIZE),
-                (screen_w // 4 * CELL_SIZE, screen_h // 2 * CELL_SIZE),
-                (3 * screen_w // 4 * CELL_SIZE, screen_h // 2 * CELL_SIZE)
-            ]
-            # Запрещаем стены в верхнем левом углу (где High Score и счета игроков)
-            for py in range(4):  # Первые 4 строки
-                for px in range(8):  # Первые 8 колонок
-                    forbidden.append((px * CELL_SIZE, py * CELL_SIZE))
-            
-            for _ in range(wall_count):
-                while True:
-                    x = random.randint(0, screen_w - 1) * CELL_SIZE
-                    y = random.randint(0, screen_h - 1) * CELL_SIZE
-                    if (x, y) not in forbidden and x != 0 and y != 0 and x != (screen_w-1)*CELL_SIZE and y != (screen_h-1)*CELL_SIZE:
-                        self.walls.append((x, y))
-                        break
-        # Игроки
-        self.snakes = []
         # Создаем словарь управления из настроек
         if controls_p1 is None:
             controls_p1 = {
@@ -1102,38 +1227,29 @@ class SnakeGame:
             controls_p2['right']: (CELL_SIZE, 0)
         }
         
-        if mode == 'single':
-            # Объединяем оба набора для одиночной игры
-            controls = {**p1_controls, **p2_controls}
-            self.snakes.append(Snake((WIDTH // 2, HEIGHT // 2), (CELL_SIZE, 0), snake_color, controls=controls))
-        elif mode == 'pvp':
-            self.snakes.append(Snake((WIDTH // 4, HEIGHT // 2), (CELL_SIZE, 0), snake_color, controls=p2_controls))
-            self.snakes.append(Snake((3*WIDTH // 4, HEIGHT // 2), (-CELL_SIZE, 0), self.bot_color, controls=p1_controls))
-        elif mode == 'bot':
-            # Объединяем оба набора для режима с ботом
-            controls = {**p1_controls, **p2_controls}
-            self.snakes.append(Snake((WIDTH // 4, HEIGHT // 2), (CELL_SIZE, 0), snake_color, controls=controls))
-            self.snakes.append(Snake((3*WIDTH // 4, HEIGHT // 2), (-CELL_SIZE, 0), self.bot_color, is_bot=True))
-        self.food = self.random_food()
-        self.game_over = False
+        # Поле игры равно размеру окна; стены, змеи и еда создаются в ядре
+        field_width, field_height = pygame.display.get_surface().get_size()
+        super().__init__(move_delay, snake_color, mode=mode, bot_color=bot_color, walls_type=walls_type,
+                         p1_controls=p1_controls, p2_controls=p2_controls,
+                         field_width=field_width, field_height=field_height, seed=seed)
+        self.replay = ReplayRecorder(self)  # Запись повтора: seed, настройки и ввод по тикам
+        self.background_cache = None  # (ключ, поверхность) — см. background()
+        # Вывод на экран только изменившихся прямоугольников (полный flip — при смене размера, темы,
+        # стен и кадрах с оверлеем); drawn_frame — (ключ кадра, спрайты прошлого кадра)
+        self.dirty_rects = self.settings.get('dirty_rects', True)
+        self.drawn_frame = None
+        self.render_mode = self.settings.get('render_mode', RENDER_MODES[0])
+        if self.render_mode not in RENDER_MODES:
+            self.render_mode = RENDER_MODES[0]
+        SPRITES.warm({snake.color for snake in self.snakes})
         self.game_started = True
-        self.last_move_time = 0
-        self.last_bot_move_time = 0  # Отдельный таймер для бота
-        self.walls_type = walls_type
-        self.countdown_start = None  # Время начала обратного отсчета
-        self.game_active = False  # Игра активна после обратного отсчета
+        # Игровое время идет от хода к ходу по расписанию змей, независимо от FPS
+        self.sim_time = 0  # Игровое время в мс (его видят ядро и запись повтора)
+        self.accumulator = 0  # Реальное время, еще не отыгранное тиками
+        self.max_catch_up = MAX_CATCH_UP_TICKS
         self.countdown_start = None  # Время начала обратного отсчета
         self.game_active = False  # Игра активна после обратного отсчета
 
-    def random_food(self):
-        while True:
-            x = random.randint(0, (WIDTH // CELL_SIZE) - 1) * CELL_SIZE
-            y = random.randint(0, (HEIGHT // CELL_SIZE) - 1) * CELL_SIZE
-            pos = (x, y)
-            if pos not in self.walls and all(pos not in s.body for s in self.snakes):
-                food_type = random.choice(FOOD_TYPES)
-                return {'pos': pos, 'type': food_type}
-
     def add_segment(self):
         # Добавляем новый сегмент в конец змеи
         if self.snake:
@@ -1141,10 +1257,65 @@ class SnakeGame:
             new_segment = (tail[0], tail[1])  # Пока на месте хвоста, но move сдвинет
             self.snake.append(new_segment)
 
+    def move(self, current_time=0):
+        # Размер поля всегда равен размеру окна
+        if self.screen is not None and self.screen.get_size() != (self.field_width, self.field_height):
+            self.set_field_size(self.screen.get_width(), self.screen.get_height())
+        tails = [snake.body[-1] for snake in self.snakes]
+        for sound_type in self.step(now_ms=current_time):
+            if self.settings['sound']:
+                play_sound(sound_type)
+        # Откуда ушли хвосты змей, сходивших на этом тике, — для отрисовки между ходами
+        for snake, tail in zip(self.snakes, tails):
+            if snake.last_move_time == current_time:
+                snake.previous_tail = tail
+
+    def render_alpha(self, snake):
+        """Какую долю пути от прошлой клетки к текущей змея прошла к моменту кадра (1 — стоит в клетке)"""
+        if self.render_mode != 'interpolate' or not snake.alive or snake.previous_tail is None:
+            return 1.0
+        span = snake.next_move_time - snake.last_move_time
+        if span <= 0:
+            return 1.0
+        # Кадр показывает момент sim_time + accumulator: тики до него уже сыграны, следующий ход змеи — позже
+        return min(1.0, max(0.0, (self.sim_time + self.accumulator - snake.last_move_time) / span))
+
+    def animating(self):
+        """Кадр меняется и без тиков и ввода: идет обратный отсчет"""
+        return not self.game_active
+
+    def advance(self, frame_ms):
+        """Отыгрывает frame_ms реального времени: тик на каждый ход по расписанию змей, в момент этого хода.
+        Возвращает, сколько тиков сыграно"""
+        self.accumulator += frame_ms
+        ticks = 0
+        while True:
+            due = self.next_move_time()
+            if due is None or due - self.sim_time > self.accumulator:
+                break
+            if ticks == self.max_catch_up:
+                self.accumulator = 0
+                break
+            # Ход мог наступить раньше sim_time (ускорение включили давно после прошлого хода)
+            due = max(due, self.sim_time)
+            self.accumulator -= due - self.sim_time
+            self.sim_time = due
+            self.move(current_time=self.sim_time)
+            ticks += 1
+            if self.game_over:
+                # Дальше тики не идут (конец игры) — несыгранное время не переносим
+                self.accumulator = 0
+                break
+        return ticks
+
     def handle_events(self):
         for event in pygame.event.get():
+            WINDOW.observe(event)
             if event.type == pygame.QUIT:
                 self.game_over = True
+            elif event.type == pygame.WINDOWEXPOSED:
+                # Окно снова видно — выводим кадр целиком
+                self.drawn_frame = None
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:
                     # Возврат в меню
@@ -1156,106 +1327,94 @@ class SnakeGame:
                         if not snake.is_bot:
                             snake.set_direction(event.key)
 
-    def move(self, current_time=0):
-        # Определяем размеры поля по текущему окну
-        # Размер поля всегда равен размеру окна
-        field_width = self.screen.get_width()
-        field_height = self.screen.get_height()
-        # Серые стены убивают только в режиме "With walls"
-        walls_enabled = (self.walls_type == 'With walls')
-        # Телепортация через края работает всегда
-        wrap_around = True
-        
-        # Бот управляет собой и двигается ТОЛЬКО по своему таймеру
-        for snake in self.snakes:
-            if snake.is_bot and snake.alive:
-                self.bot_move(snake)
-                # Бот двигается с учетом своего bot_speedup независимо от игрока
-                bot_delay = self.move_delay // 2 if snake.bot_speedup else self.move_delay
-                if current_time - self.last_bot_move_time > bot_delay:
-                    snake.move(wrap_around=wrap_around, field_width=field_width, field_height=field_height)
-                    self.last_bot_move_time = current_time
-        
-        # Двигаем только не-ботов (игроков) - они двигаются по отдельному таймеру в run()
-        for snake in self.snakes:
-            if not snake.is_bot and snake.alive:
-                # wrap_around если walls_type == 'No walls' или 'Teleport'
-                snake.move(wrap_around=wrap_around, field_width=field_width, field_height=field_height)
-        # Проверяем коллизии только для живых змей
-        for snake in self.snakes:
-            if not snake.alive:
-                continue
-            snake.check_collision(
-                self.walls,
-                [s for s in self.snakes if s.alive],
-                walls_enabled=walls_enabled,
-                field_width=field_width,
-                field_height=field_height,
-                wrap_around=wrap_around
-            )
-        # Проверяем сбор яблока только живыми змеями
-        for snake in self.snakes:
-            if not snake.alive:
-                continue
-            head = snake.get_head()
-            head_grid = (head[0] // CELL_SIZE * CELL_SIZE, head[1] // CELL_SIZE * CELL_SIZE)
-            food_grid = (self.food['pos'][0] // CELL_SIZE * CELL_SIZE, self.food['pos'][1] // CELL_SIZE * CELL_SIZE)
-            if head_grid == food_grid:
-                food_type = self.food['type']
-                
-                if food_type == 'gold':
-                    points = 30
-                    growth = 3
-                    if self.settings['sound']:
-                        play_sound('golden')
-                else:  # normal
-                    points = 10
-                    growth = 1
-                    if self.settings['sound']:
-                        play_sound('eat')
-                
-                snake.score += points
-                snake.grow(growth)
-                
-                self.food = self.random_food()
-        if not any(s.alive for s in self.snakes):
-            if self.settings['sound']:
-                play_sound('death')
-            self.game_over = True
-        heads = [snake.get_head() for snake in self.snakes if snake.alive]
-        for i, snake in enumerate(self.snakes):
-            if not snake.alive:
-                continue
-            for j, other in enumerate(self.snakes):
-                if i != j and other.alive and snake.get_head() == other.get_head():
-                    snake.alive = False
-                    other.alive = False
-                    if self.settings['sound']:
-                        play_sound('death')
-        if self.mode in ('single', 'bot', 'pvp'):
-            if not self.snakes[0].alive or (len(self.snakes) > 1 and not self.snakes[1].alive):
-                if self.settings['sound']:
-                    play_sound('death')
-                self.game_over = True
-
-    def draw(self):
+    def background(self):
+        """Фон темы, сетка и стены одной поверхностью — рисуется раз на размер окна, тему и стены"""
+        width, height = self.screen.get_size()
+        key = (width, height, self.theme)
+        if self.background_cache is not None and self.background_cache[0] == key:
+            return self.background_cache[1]
+        surface = pygame.Surface((width, height)).convert(self.screen)
         # Применяем цвет фона из темы
-        bg_color = self.theme_colors['background']
-        self.screen.fill(bg_color)
-        
+        surface.fill(self.theme_colors['background'])
         # Рисуем сетку с цветом из темы
         grid_color = self.theme_colors['grid']
-        for x in range(0, self.screen.get_width(), CELL_SIZE):
-            pygame.draw.line(self.screen, grid_color, (x, 0), (x, self.screen.get_height()))
-        for y in range(0, self.screen.get_height(), CELL_SIZE):
-            pygame.draw.line(self.screen, grid_color, (0, y), (self.screen.get_width(), y))
+        for x in range(0, width, CELL_SIZE):
+            pygame.draw.line(surface, grid_color, (x, 0), (x, height))
+        for y in range(0, height, CELL_SIZE):
+            pygame.draw.line(surface, grid_color, (0, y), (width, y))
+        for wall in self.walls:
+            self.draw_wall(surface, wall[0], wall[1])
+        self.background_cache = (key, surface)
+        return surface
+
+    def draw_wall(self, surface, x, y):
+        # Основной цвет стены
+        wall_color = (100, 100, 100)
+        darker_gray = (70, 70, 70)
+        lighter_gray = (130, 130, 130)
+        
+        # Основной квадрат
+        pygame.draw.rect(surface, wall_color, (x, y, CELL_SIZE, CELL_SIZE))
+        # Темная обводка
+        pygame.draw.rect(surface, darker_gray, (x, y, CELL_SIZE, CELL_SIZE), 2)
+        # Светлые линии (кирпичный эффект)
+        pygame.draw.line(surface, lighter_gray, (x, y + CELL_SIZE // 2), (x + CELL_SIZE, y + CELL_SIZE // 2), 1)
+        pygame.draw.line(surface, lighter_gray, (x + CELL_SIZE // 2, y), (x + CELL_SIZE // 2, y + CELL_SIZE), 1)
+        # Диагональные линии для текстуры
+        pygame.draw.line(surface, darker_gray, (x + 2, y + 2), (x + 6, y + 6), 1)
+        pygame.draw.line(surface, darker_gray, (x + CELL_SIZE - 6, y + 2), (x + CELL_SIZE - 2, y + 6), 1)
+
+    def hud_entries(self):
+        """Тексты поверх поля как (ключ, поверхность, позиция): рекорд и счет змей —
+        между ними ложится затемнение обратного отсчета"""
+        top = []
+        scores = []
+        
+        def text(entries, font, size, line, color, pos):
+            entries.append((('text', size, line, color), render_text(font, line, color), pos))
         
         # High Score в левом верхнем углу
-        font = pygame.font.SysFont(None, 36)
+        font = get_font(36)
         leaderboard = load_leaderboard()
         high_score = leaderboard[0]['score'] if leaderboard else 0
-        high_score_text = font.render(f"High Score: {high_score}", True, GOLD)
-        self.screen.blit(high_score_text, (10, 10))
+        text(top, font, 36, f"High Score: {high_score}", GOLD, (10, 10))
+        
+        # Score текущих игроков
+        for i, snake in enumerate(self.snakes):
+            if self.mode == "bot":
+                label = "Player" if i == 0 else "Bot"
+            else:
+                label = f"P{i+1}"
+            text(scores, font, 36, f"{label}: {snake.score}", snake.color, (10, 50 + i * 35))
+        return top, scores
+
+    def food_entry(self):
+        """Спрайт еды как (ключ, поверхность, позиция); None, когда поле заполнено целиком и еды нет"""
+        if self.food is None:
+            return None
+        sprite = SPRITES.food(self.food['type'])
+        fx = (self.food['pos'][0] // CELL_SIZE) * CELL_SIZE
+        fy = (self.food['pos'][1] // CELL_SIZE) * CELL_SIZE
+        return (sprite, sprite, (fx, fy))
+
+    def draw(self):
+        background = self.background()
+        
+        # Кадр без обратного отсчета — это фон и спрайты (тексты, змеи, еда) поверх него.
+        # Такой кадр можно не перерисовывать целиком: хватит восстановить фон и спрайты там,
+        # где они поменялись с прошлого кадра, и вывести на экран только эти прямоугольники
+        overlays = not self.game_active
+        frame_key = (self.screen.get_size(), background)
+        if (self.dirty_rects and not overlays and self.drawn_frame is not None
+                and self.drawn_frame[0] == frame_key):
+            self.draw_changes(frame_key, background)
+            return
+        
+        # Фон, сетка и стены — готовой поверхностью
+        self.screen.blit(background, (0, 0))
+        
+        top, scores = self.hud_entries()
+        self.screen.blits([(surface, pos) for _, surface, pos in top], doreturn=False)
         
         # Отображение обратного отсчета
         if not self.game_active and self.countdown_start is not None:
@@ -1266,155 +1425,67 @@ class SnakeGame:
                 # Полупрозрачный фон на весь экран
                 screen_width = self.screen.get_width()
                 screen_height = self.screen.get_height()
-                overlay = pygame.Surface((screen_width, screen_height))
+                overlay = SURFACES.get((screen_width, screen_height))
                 overlay.set_alpha(128)
                 overlay.fill((0, 0, 0))
                 self.screen.blit(overlay, (0, 0))
                 
                 # Большие цифры обратного отсчета
-                countdown_font = pygame.font.Font(None, 200)
-                countdown_text = countdown_font.render(str(countdown), True, (255, 255, 0))
+                countdown_font = get_font(200)
+                countdown_text = render_text(countdown_font, str(countdown), (255, 255, 0))
                 countdown_rect = countdown_text.get_rect(center=(screen_width // 2, screen_height // 2))
                 self.screen.blit(countdown_text, countdown_rect)
             else:
                 self.game_active = True
         
-        # Score текущих игроков
-        for i, snake in enumerate(self.snakes):
-            if self.mode == "bot":
-                label = "Player" if i == 0 else "Bot"
-            else:
-                label = f"P{i+1}"
-            text = font.render(f"{label}: {snake.score}", True, snake.color)
-            self.screen.blit(text, (10, 50 + i * 35))
-        
-        # Рисуем стены
-        for wall in self.walls:
-            # Основной цвет стены
-            wall_color = (100, 100, 100)
-            darker_gray = (70, 70, 70)
-            lighter_gray = (130, 130, 130)
-            
-            # Основной квадрат
-            pygame.draw.rect(self.screen, wall_color, (wall[0], wall[1], CELL_SIZE, CELL_SIZE))
-            # Темная обводка
-            pygame.draw.rect(self.screen, darker_gray, (wall[0], wall[1], CELL_SIZE, CELL_SIZE), 2)
-            # Светлые линии (кирпичный эффект)
-            pygame.draw.line(self.screen, lighter_gray, (wall[0], wall[1] + CELL_SIZE // 2), (wall[0] + CELL_SIZE, wall[1] + CELL_SIZE // 2), 1)
-            pygame.draw.line(self.screen, lighter_gray, (wall[0] + CELL_SIZE // 2, wall[1]), (wall[0] + CELL_SIZE // 2, wall[1] + CELL_SIZE), 1)
-            # Диагональные линии для текстуры
-            pygame.draw.line(self.screen, darker_gray, (wall[0] + 2, wall[1] + 2), (wall[0] + 6, wall[1] + 6), 1)
-            pygame.draw.line(self.screen, darker_gray, (wall[0] + CELL_SIZE - 6, wall[1] + 2), (wall[0] + CELL_SIZE - 2, wall[1] + 6), 1)
+        self.screen.blits([(surface, pos) for _, surface, pos in scores], doreturn=False)
+        entries = top + scores
         
         # Рисуем змей
         for snake in self.snakes:
-            snake.draw(self.screen)
-        
-        # Рисуем еду
-        fx = (self.food['pos'][0] // CELL_SIZE) * CELL_SIZE
-        fy = (self.food['pos'][1] // CELL_SIZE) * CELL_SIZE
-        
-        if self.food['type'] == 'gold':
-            # Золотое яблоко
-            food_color = GOLD
-            darker_color = (200, 170, 0)
-        else:
-            # Красное яблоко
-            food_color = RED
-            darker_color = (180, 0, 0)
-        
-        # Тень
-        shadow_color = (50, 50, 50)
-        pygame.draw.circle(self.screen, shadow_color, (fx + CELL_SIZE // 2 + 2, fy + CELL_SIZE - 3), CELL_SIZE // 3)
-        
-        # Основное яблоко (круг) с градиентом
-        pygame.draw.circle(self.screen, darker_color, (fx + CELL_SIZE // 2 + 1, fy + CELL_SIZE // 2 + 1), CELL_SIZE // 2 - 2)
-        pygame.draw.circle(self.screen, food_color, (fx + CELL_SIZE // 2, fy + CELL_SIZE // 2), CELL_SIZE // 2 - 2)
+            entries.extend((sprite, sprite, pos) for sprite, pos in snake.draw(self.screen, self.render_alpha(snake)))
         
-        # Темная обводка
-        pygame.draw.circle(self.screen, (0, 0, 0), (fx + CELL_SIZE // 2, fy + CELL_SIZE // 2), CELL_SIZE // 2 - 2, 2)
-        
-        # Блик
-        highlight_color = (255, 255, 255)
-        pygame.draw.circle(self.screen, highlight_color, (fx + CELL_SIZE // 2 - 3, fy + CELL_SIZE // 2 - 4), 4)
+        # Рисуем еду (когда поле заполнено целиком, еды нет)
+        food = self.food_entry()
+        if food is not None:
+            self.screen.blit(food[1], food[2])
+            entries.append(food)
         
-        # Листик
-        leaf_color = (0, 150, 0)
-        leaf_points = [
-            (fx + CELL_SIZE // 2, fy + 3),
-            (fx + CELL_SIZE // 2 + 5, fy),
-            (fx + CELL_SIZE // 2 + 3, fy + 6)
-        ]
-        pygame.draw.polygon(self.screen, leaf_color, leaf_points)
+        # Кадр с обратным отсчетом следующим кадром перерисовывается целиком
+        self.drawn_frame = None if overlays else (frame_key, entries)
         
         pygame.display.flip()
 
-    def bot_move(self, snake):
-        # Бот: идёт к еде, умеет обходить стены
-        head = snake.get_head()
-        fx, fy = self.food['pos']
-        player = self.snakes[0]
-        px, py = player.get_head()
-        options = [
-            (CELL_SIZE, 0), (-CELL_SIZE, 0), (0, CELL_SIZE), (0, -CELL_SIZE)
-        ]
-        best = snake.direction
-        min_dist = float('inf')
-        # 20% шанс попытаться подрезать игрока
-        import random
-        if random.random() < 0.2 and player.alive:
-            target = (px, py)
-        else:
-            target = (fx, fy)
-        
-        # Бот решает сам когда ускоряться
-        # Ускоряется если: далеко от цели (>200 пикселей) или близко к опасности
-        distance_to_target = abs(head[0] - target[0]) + abs(head[1] - target[1])
-        snake.bot_speedup = distance_to_target > 200
-        
-        # Нормализуем координаты стен к сетке
-        walls_grid = set()
-        for wall in self.walls:
-            wall_grid = ((wall[0] // CELL_SIZE) * CELL_SIZE, (wall[1] // CELL_SIZE) * CELL_SIZE)
-            walls_grid.add(wall_grid)
-        
-        # Оцениваем каждое направление
-        valid_moves = []
-        for d in options:
-            nx, ny = head[0] + d[0], head[1] + d[1]
-            pos_grid = ((nx // CELL_SIZE) * CELL_SIZE, (ny // CELL_SIZE) * CELL_SIZE)
-            
-            # Проверка разворота на 180 градусов
-            if (d[0] == -snake.direction[0] and d[1] == -snake.direction[1]):
-                continue
-            
-            # Проверка стены
-            if pos_grid in walls_grid:
-                continue
-            
-            # Проверка столкновения с собой
-            if (nx, ny) in snake.body:
-                continue
-                
-            # Проверка границ (если есть)
-            field_width = self.screen.get_width()
-            field_height = self.screen.get_height()
-            if self.walls_type != 'No walls':
-                if nx < 0 or nx >= field_width or ny < 0 or ny >= field_height:
-                    continue
-            
-            # Рассчитываем расстояние до цели
-            dist = abs(target[0] - nx) + abs(target[1] - ny)
-            valid_moves.append((d, dist))
-        
-        # Выбираем лучший ход из валидных
-        if valid_moves:
-            valid_moves.sort(key=lambda x: x[1])
-            best = valid_moves[0][0]
+    def draw_changes(self, frame_key, background):
+        """Перерисовывает и выводит на экран только то, что поменялось с прошлого кадра"""
+        top, scores = self.hud_entries()
+        entries = top + scores
+        for snake in self.snakes:
+            head, segments = snake.sprites(self.render_alpha(snake))
+            entries.extend((sprite, sprite, pos) for sprite, pos in segments)
+            if head is not None:
+                entries.append((head[0], head[0], head[1]))
+        food = self.food_entry()
+        if food is not None:
+            entries.append(food)
         
-        snake.next_direction = best
+        rects = changed_rects(self.drawn_frame[1], entries)
+        self.drawn_frame = (frame_key, entries)
+        if not rects:
+            return
+        # В каждом прямоугольнике — фон и все спрайты, что его задевают, в порядке кадра;
+        # клип не дает им закрасить соседние клетки, которые не перерисовываются
+        sprite_rects = [surface.get_rect(topleft=pos) for _, surface, pos in entries]
+        screen = self.screen
+        for rect in rects:
+            screen.set_clip(rect)
+            screen.blit(background, rect, rect)
+            screen.blits([entries[i][1:] for i in rect.collidelistall(sprite_rects)], doreturn=False)
+        screen.set_clip(None)
+        pygame.display.update(rects)
 
     async def show_game_over(self):
+        save_replay(self.replay)
         # Сохраняем результат в таблицу лидеров
         if self.mode == 'single' and self.snakes[0].score > 0:
             add_score_to_leaderboard('Player', self.snakes[0].score)
@@ -1470,10 +1541,12 @@ class SnakeGame:
                 win_text = "DRAW"
                 win_color = WHITE
 
-        button_font = pygame.font.SysFont(None, 36)
+        button_font = get_font(36)
         
+        # Экран итогов неподвижен: перерисовывается и выводится, только когда пришли события
+        # (ввод, смена размера, окно снова видно), а между ними ждет в idle_wait
+        redraw = True
         while True:
-            self.screen.fill(BLACK)
             # Получаем текущие размеры окна для центрирования
             screen_w = self.screen.get_width()
             screen_h = self.screen.get_height()
@@ -1487,34 +1560,12 @@ class SnakeGame:
                 {"text": "Quit", "rect": pygame.Rect(center_x - 100, center_y + 140, 200, 50), "action": None}
             ]
             
-            font = pygame.font.SysFont(None, 48)
-            # Крупно и по центру — PLAYER WINS/LOSE/DRAW
-            if win_text is not None:
-                big_font = pygame.font.SysFont(None, 96)
-                text = big_font.render(win_text, True, win_color)
-                text_rect = text.get_rect(center=(center_x, center_y - 120))
-                self.screen.blit(text, text_rect)
-            # Выводим счет всех змей
-            score_font = pygame.font.SysFont(None, 36)
-            y_offset = center_y - 40
-            for i, snake in enumerate(self.snakes):
-                if self.mode == "bot":
-                    label = "Player" if i == 0 else "Bot"
-                else:
-                    label = f"P{i+1}"
-                score_text = score_font.render(f"{label} Score: {snake.score}", True, snake.color)
-                score_rect = score_text.get_rect(center=(center_x, y_offset + i * 40))
-                self.screen.blit(score_text, score_rect)
-
-            for button in buttons:
-                pygame.draw.rect(self.screen, GRAY, button["rect"])
-                text_surf = button_font.render(button["text"], True, BLACK)
-                text_rect = text_surf.get_rect(center=button["rect"].center)
-                self.screen.blit(text_surf, text_rect)
-
-            pygame.display.flip()
+            if redraw or not self.dirty_rects:
+                self.draw_game_over(buttons, win_text, win_color, button_font)
+            redraw = False
 
             for event in pygame.event.get():
+                WINDOW.observe(event)
                 if event.type == pygame.QUIT:
                     return None
                 elif event.type == pygame.MOUSEBUTTONDOWN:
@@ -1522,21 +1573,72 @@ class SnakeGame:
                         for button in buttons:
                             if button["rect"].collidepoint(event.pos):
                                 return button["action"]
-            await asyncio.sleep(0)
-            self.clock.tick(FPS)
+                if event.type != pygame.MOUSEMOTION:
+                    redraw = True
+            await idle_wait()
+
+    def draw_game_over(self, buttons, win_text, win_color, button_font):
+        """Экран итогов: кто победил, счет змей и кнопки"""
+        self.screen.fill(BLACK)
+        center_x = self.screen.get_width() // 2
+        center_y = self.screen.get_height() // 2
+        font = get_font(48)
+        # Крупно и по центру — PLAYER WINS/LOSE/DRAW
+        if win_text is not None:
+            big_font = get_font(96)
+            text = render_text(big_font, win_text, win_color)
+            text_rect = text.get_rect(center=(center_x, center_y - 120))
+            self.screen.blit(text, text_rect)
+        # Выводим счет всех змей
+        score_font = get_font(36)
+        y_offset = center_y - 40
+        for i, snake in enumerate(self.snakes):
+            if self.mode == "bot":
+                label = "Player" if i == 0 else "Bot"
+            else:
+                label = f"P{i+1}"
+            score_text = render_text(score_font, f"{label} Score: {snake.score}", snake.color)
+            score_rect = score_text.get_rect(center=(center_x, y_offset + i * 40))
+            self.screen.blit(score_text, score_rect)
+
+        for button in buttons:
+            pygame.draw.rect(self.screen, GRAY, button["rect"])
+            text_surf = render_text(button_font, button["text"], BLACK)
+            text_rect = text_surf.get_rect(center=button["rect"].center)
+            self.screen.blit(text_surf, text_rect)
+
+        pygame.display.flip()
 
     async def run(self):
         # Запускаем обратный отсчет
         self.countdown_start = pygame.time.get_ticks()
         
+        last_frame = pygame.time.get_ticks()
+        slept = False  # Прошлый кадр окно было свернуто
         while not self.game_over:
             current_time = pygame.time.get_ticks()
+            frame_ms = current_time - last_frame
+            last_frame = current_time
+            had_events = pygame.event.peek()
             self.handle_events()
             # Проверка на возврат в меню по Escape
             if not self.game_started:
                 return 'menu'
+            if slept:
+                # Время, пока окно было свернуто, не идет ни игре, ни обратному отсчету
+                if not self.game_active and self.countdown_start is not None:
+                    self.countdown_start += frame_ms
+                frame_ms = 0
+            slept = WINDOW.minimized
+            if slept:
+                # Свернутое окно (скрытую вкладку) никто не видит: игра стоит, кадры не рисуются,
+                # цикл ждет в idle_wait; после возврата кадр выводится целиком
+                self.drawn_frame = None
+                await idle_wait()
+                continue
             
             # Движение только после завершения обратного отсчета
+            ticks = 0
             if self.game_active:
                 # Ускорение змейки при удержании клавиш ускорения (только для игроков, НЕ для бота)
                 speedup = False
@@ -1545,14 +1647,13 @@ class SnakeGame:
                     if keys[speedup_key]:
                         speedup = True
                         break
-                delay = self.move_delay // 2 if speedup else self.move_delay
-                
-                # Двигаем игроков по их таймеру
-                if current_time - self.last_move_time > delay:
-                    # Передаем current_time для обработки бота внутри move()
-                    self.move(current_time=current_time)
-                    self.last_move_time = current_time
-            self.draw()
+                for i, snake in enumerate(self.snakes):
+                    if not snake.is_bot:
+                        self.set_boost(i, speedup)
+                ticks = self.advance(frame_ms)
+            # В режиме 'on-change' кадр без тиков, ввода и анимации совпал бы с прошлым — не рисуем
+            if self.render_mode != 'on-change' or ticks or had_events or self.animating():
+                self.draw()
             await asyncio.sleep(0)
             self.clock.tick(FPS)
 
@@ -0,0 +1,271 @@
+# Поиск пути для бота: поля BFS-расстояний до цели по сетке занятости (snake_core.OccupancyGrid или ChunkedGrid).
+# Поле считается от цели один раз и дальше переиспользуется: бот на каждом тике только
+# смотрит расстояние в соседних клетках. После ходов змей поле не пересчитывается, а чинится
+# по клеткам, которые змеи заняли или освободили, — и остается таким же, как новый BFS.
+# На большом поле (больше DENSE_FIELD_CELLS клеток) поле расстояний считается только в окрестности
+# цели, а соседи клеток — на лету, без таблицы на все поле.
+from array import array
+from functools import lru_cache
+from itertools import chain
+
+# Расстояние до клеток, куда от цели не дойти
+UNREACHABLE = 1 << 30
+# Поля до стольких клеток считаются целиком, с таблицей соседей
+DENSE_FIELD_CELLS = 1 << 16
+# На сколько шагов от цели обходит BFS на большом поле (ромб около 4000 клеток)
+SPARSE_FIELD_RADIUS = 45
+# Сколько клеток со сменой занятости поле может копить до починки; дальше проще пересчитать его
+FIELD_CHANGES_LIMIT = 256
+
+
+@lru_cache(maxsize=16)
+def neighbour_table(cols, rows, wrap):
+    """Соседи каждой клетки поля; с wrap соседи через край — на другой стороне"""
+    table = []
+    for y in range(rows):
+        for x in range(cols):
+            cells = []
+            for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+                nx, ny = x + dx, y + dy
+                if wrap:
+                    nx %= cols
+                    ny %= rows
+                elif not (0 <= nx < cols and 0 <= ny < rows):
+                    continue
+                cells.append(ny * cols + nx)
+            table.append(tuple(cells))
+    return tuple(table)
+
+
+class LazyNeighbours:
+    # Соседи клеток большого поля: считаются при обращении, таблица на миллион клеток не строится
+    def __init__(self, cols, rows, wrap):
+        self.cols = cols
+        self.rows = rows
+        self.wrap = wrap
+
+    def __getitem__(self, cell):
+        cols, rows = self.cols, self.rows
+        y, x = divmod(cell, cols)
+        row = y * cols
+        if self.wrap:
+            return (row + (x + 1) % cols, row + (x - 1) % cols,
+                    (y + 1) % rows * cols + x, (y - 1) % rows * cols + x)
+        cells = []
+        if x + 1 < cols:
+            cells.append(cell + 1)
+        if x > 0:
+            cells.append(cell - 1)
+        if y + 1 < rows:
+            cells.append(cell + cols)
+        if y > 0:
+            cells.append(cell - cols)
+        return cells
+
+
+def grid_neighbours(grid, wrap):
+    """Соседи клеток сетки: таблица для обычного поля, расчет на лету для большого"""
+    if grid.cols * grid.rows > DENSE_FIELD_CELLS:
+        return LazyNeighbours(grid.cols, grid.rows, wrap)
+    return neighbour_table(grid.cols, grid.rows, wrap)
+
+
+class SparseField(dict):
+    # Поле расстояний большого поля: клетка -> расстояние только для обойденных клеток
+    def __missing__(self, cell):
+        return UNREACHABLE
+
+
+def distance_field(grid, target, wrap):
+    """BFS от клетки target: расстояния до каждой клетки в обход стен и тел змей"""
+    if grid.cols * grid.rows > DENSE_FIELD_CELLS:
+        return sparse_distance_field(grid, target, wrap, SPARSE_FIELD_RADIUS)
+    # array, а не список: поле на все клетки в 4 байта на клетку
+    dist = array('i', [UNREACHABLE]) * (grid.cols * grid.rows)
+    dist[target] = 0
+    neighbours = neighbour_table(grid.cols, grid.rows, wrap)
+    walls = grid.walls
+    count = grid.count
+    frontier = [target]
+    d = 0
+    while frontier:
+        d += 1
+        next_frontier = []
+        for cell in frontier:
+            for n in neighbours[cell]:
+                if dist[n] == UNREACHABLE and not walls[n] and not count[n]:
+                    dist[n] = d
+                    next_frontier.append(n)
+        frontier = next_frontier
+    return dist
+
+
+def sparse_distance_field(grid, target, wrap, radius):
+    """BFS от target не дальше radius шагов; дальше — UNREACHABLE.
+    Бот вне окрестности идет к цели напрямую, а в нее войдя — уже в обход препятствий"""
+    dist = SparseField({target: 0})
+    neighbours = grid_neighbours(grid, wrap)
+    is_free = grid.is_free  # Одно обращение к чанку вместо двух (стены и змеи)
+    frontier = [target]
+    d = 0
+    while frontier and d < radius:
+        d += 1
+        next_frontier = []
+        for cell in frontier:
+            for n in neighbours[cell]:
+                if n not in dist and is_free(n):
+                    dist[n] = d
+                    next_frontier.append(n)
+        frontier = next_frontier
+    return dist
+
+
+class Pathfinder:
+    # Кэш полей расстояний по "слотам" цели: ('food',) — одно поле на всех ботов,
+    # ('snake', id) — поле до головы змеи. Поле живет, пока цель и стены те же; клетки, которые
+    # змеи заняли или освободили (журнал grid.changed), оно копит и перед выдачей чинится по ним.
+    # Выданное поле всегда совпадает с новым BFS, поэтому от кэша ходы бота не зависят
+    # и в снимок игры он не входит.
+    def __init__(self, grid):
+        self.grid = grid
+        self.fields = {}  # слот -> [цель, wrap, версия стен, расстояния, горизонт, клетки со сменой занятости]
+
+    def distances(self, slot, target, wrap):
+        self.collect()
+        cached = self.fields.get(slot)
+        if cached is not None:
+            cached_target, cached_wrap, wall_version, dist, horizon, changed = cached
+            if cached_target == target and cached_wrap == wrap and wall_version == self.grid.wall_version:
+                if changed:
+                    self.repair(dist, horizon, target, wrap, changed)
+                    changed.clear()
+                return dist
+        dist = distance_field(self.grid, target, wrap)
+        # Расстояния от горизонта и дальше поле не хранит: у разреженного поля они UNREACHABLE
+        horizon = SPARSE_FIELD_RADIUS + 1 if isinstance(dist, SparseField) else UNREACHABLE
+        self.fields[slot] = [target, wrap, self.grid.wall_version, dist, horizon, set()]
+        return dist
+
+    def collect(self):
+        """Разносит журнал сетки по полям. Симуляция зовет его каждый тик, чтобы журнал не рос"""
+        changed = self.grid.changed
+        if not changed:
+            return
+        for slot, field in list(self.fields.items()):
+            field[5].update(changed)
+            # Поле, которое давно не спрашивали, дешевле посчитать заново, чем чинить
+            if len(field[5]) > FIELD_CHANGES_LIMIT:
+                del self.fields[slot]
+        changed.clear()
+
+    def repair(self, dist, horizon, target, wrap, cells):
+        """Доводит поле до нового BFS после смены занятости клеток cells: сначала забывает расстояния,
+        чей кратчайший путь до цели перекрыт, потом продолжает BFS в забытые и освободившиеся клетки"""
+        neighbours = grid_neighbours(self.grid, wrap)
+        is_free = self.grid.is_free
+        # Клетка на уровне k держится, пока свободна и рядом есть клетка уровня k - 1.
+        # Уровни разбираются по возрастанию: к уровню k все клетки ниже уже проверены
+        pending = {}
+        for cell in cells:
+            if cell != target and dist[cell] < UNREACHABLE and not is_free(cell):
+                pending.setdefault(dist[cell], set()).add(cell)
+        forgotten = []
+        while pending:
+            level = min(pending)
+            below = level - 1
+            above = level + 1
+            for cell in pending.pop(level):
+                around = neighbours[cell]
+                if is_free(cell) and any(dist[n] == below for n in around):
+                    continue
+                dist[cell] = UNREACHABLE
+                forgotten.append(cell)
+                for n in around:
+                    if dist[n] == above:
+                        pending.setdefault(above, set()).add(n)
+        # BFS от известных соседей; волна идет по уровням, и каждая клетка получает свой кратчайший путь
+        frontier = {}
+        for cell in chain(forgotten, cells):
+            if cell != target and is_free(cell):
+                d = 1 + min([dist[n] for n in neighbours[cell]])
+                if d < dist[cell] and d < horizon:
+                    frontier.setdefault(d, []).append(cell)
+        while frontier:
+            d = min(frontier)
+            wave = []
+            for cell in frontier.pop(d):
+                if d < dist[cell]:
+                    dist[cell] = d
+                    wave.append(cell)
+            d += 1
+            if d < horizon:
+                for cell in wave:
+                    for n in neighbours[cell]:
+                        if d < dist[n] and n != target and is_free(n):
+                            frontier.setdefault(d, []).append(n)
+
+
+def reachable_area(grid, start, wrap, limit):
+    """Сколько свободных клеток достижимо из start (считая ее саму); счет обрывается на limit"""
+    neighbours = grid_neighbours(grid, wrap)
+    walls = grid.walls
+    count = grid.count
+    seen = {start}
+    stack = [start]
+    while stack and len(seen) < limit:
+        for n in neighbours[stack.pop()]:
+            if n not in seen and not walls[n] and not count[n]:
+                seen.add(n)
+                stack.append(n)
+    return min(len(seen), limit)
+
+
+@lru_cache(maxsize=16)
+def hamiltonian_cycle(cols, rows):
+    """Гамильтонов цикл по полю: (клетки в порядке обхода, номер каждой клетки в цикле).
+    None, если цикла нет (обе стороны нечетные или поле уже 2 клеток)"""
+    if cols < 2 or rows < 2 or (cols % 2 and rows % 2):
+        return None
+    transpose = rows % 2 == 1
+    if transpose:
+        cols, rows = rows, cols
+    # Строка 0 слева направо, дальше "змейкой" по столбцам 1..cols-1 и назад вверх по столбцу 0.
+    # Четное число строк нужно, чтобы змейка закончилась у столбца 1
+    points = [(x, 0) for x in range(cols)]
+    for y in range(1, rows):
+        xs = range(cols - 1, 0, -1) if y % 2 else range(1, cols)
+        points.extend((x, y) for x in xs)
+    points.extend((0, y) for y in range(rows - 1, 0, -1))
+    if transpose:
+        cols, rows = rows, cols
+        points = [(y, x) for x, y in points]
+    cycle = tuple(y * cols + x for x, y in points)
+    order = [0] * len(cycle)
+    for i, cell in enumerate(cycle):
+        order[cell] = i
+    return cycle, tuple(order)
+
+
+def hamiltonian_step(cycle, order, head, tail, length, food, grow_pending, max_growth, candidates):
+    """Клетка для следующего хода по циклу: срезаем вперед по циклу к еде, если срез не приведет к хвосту.
+    candidates — свободные соседние клетки головы, max_growth — наибольший прирост от одного яблока"""
+    size = len(cycle)
+    pos = order[head]
+    # Тело лежит на цикле от хвоста до головы, впереди до хвоста — свободный участок.
+    # Пока змея растет, хвост стоит и участок сокращается; срез пропускает клетки, которые
+    # освободятся, только когда хвост их пройдет (через length + grow_pending ходов).
+    # Запас на весь рост за это время: по яблоку за ход, но не больше, чем свободно клеток.
+    # Так голова никогда не догоняет хвост, и змея доходит до заполненного поля
+    gap = (order[tail] - pos) % size or size  # у змеи из одной клетки хвост совпадает с головой
+    reserve = min(max_growth * (length + grow_pending), size - length - grow_pending)
+    room = gap - grow_pending - reserve
+    best = cycle[(pos + 1) % size]
+    best_left = (order[food] - order[best]) % size if food >= 0 else 0
+    for cell in candidates:
+        ahead = (order[cell] - pos) % size
+        if ahead <= 1 or ahead >= room:
+            continue
+        left = (order[food] - order[cell]) % size if food >= 0 else 0
+        if left < best_left:
+            best, best_left = cell, left
+    return best
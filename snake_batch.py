@@ -0,0 +1,177 @@
+# Пакетный движок: N независимых одиночных игр в массивах NumPy, один векторный step(actions) на все.
+# Правила те же, что в snake_core (Snake.move, Snake.check_collision, телепорт через края, еда и золото),
+# законченные игры перезапускаются автоматически. Нужен для обучения и оценки ботов на миллионах ходов.
+import numpy as np
+
+from snake_core import WIDTH, HEIGHT, CELL_SIZE, FOOD_TYPES, FOOD_REWARDS, wall_count_for_delay, forbidden_wall_cells
+
+# Действия — индексы в snake_core.DIRECTIONS: RIGHT, LEFT, DOWN, UP; -1 — не менять направление
+ACTION_DX = np.array([1, -1, 0, 0], dtype=np.int64)
+ACTION_DY = np.array([0, 0, 1, -1], dtype=np.int64)
+OPPOSITE_ACTION = np.array([1, 0, 3, 2], dtype=np.int64)
+
+FOOD_POINTS = np.array([FOOD_REWARDS[t][0] for t in FOOD_TYPES], dtype=np.int64)
+FOOD_GROWTH = np.array([FOOD_REWARDS[t][1] for t in FOOD_TYPES], dtype=np.int64)
+
+# Метка "клетка никогда не занималась" в массиве меток
+EMPTY_STAMP = -(1 << 40)
+
+
+class BatchSnakeEnv:
+    # Тело каждой змеи — кольцевой буфер индексов клеток. Занятость хранится как метка хода,
+    # на котором голова зашла в клетку: клетка занята телом, если метка > moves - length.
+    # Поэтому хвост не нужно стирать — он "устаревает" сам, и шаг не зависит от длины змей.
+    # Счетчик moves не обнуляется при перезапуске, так что старые метки тоже устаревают сами.
+    # Карты стен генерируются один раз пулом из wall_layouts штук, игра при перезапуске берет случайную.
+    def __init__(self, n, cols=WIDTH // CELL_SIZE, rows=HEIGHT // CELL_SIZE, walls_type='No walls', move_delay=100, seed=None, wall_layouts=256):
+        self.n = n
+        self.cols = cols
+        self.rows = rows
+        self.cells = cols * rows
+        self.rng = np.random.default_rng(seed)
+        self.start_cell = rows // 2 * cols + cols // 2
+        self.wall_count = wall_count_for_delay(move_delay) if walls_type == 'With walls' else 0
+        # Клетки, где можно ставить стены: не по периметру и не в запрещенных местах
+        forbidden = forbidden_wall_cells(cols, rows)
+        self.wall_candidates = np.array([
+            y * cols + x
+            for y in range(1, rows - 1)
+            for x in range(1, cols - 1)
+            if (x, y) not in forbidden
+        ], dtype=np.int64)
+        self.wall_count = min(self.wall_count, len(self.wall_candidates))
+        self.wall_layouts = self.generate_wall_layouts(wall_layouts if self.wall_count else 1)
+
+        self.env_index = np.arange(n)
+        self.body = np.zeros((n, self.cells), dtype=np.int32)
+        self.head_ptr = np.zeros(n, dtype=np.int64)
+        self.length = np.ones(n, dtype=np.int64)
+        self.grow_pending = np.zeros(n, dtype=np.int64)
+        self.direction = np.zeros(n, dtype=np.int64)
+        self.moves = np.zeros(n, dtype=np.int64)
+        self.stamp = np.full((n, self.cells), EMPTY_STAMP, dtype=np.int64)
+        self.layout = np.zeros(n, dtype=np.int64)  # Индекс карты стен в self.wall_layouts
+        self.food = np.zeros(n, dtype=np.int64)
+        self.food_type = np.zeros(n, dtype=np.int64)  # Индекс в FOOD_TYPES
+        self.score = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        # Итоги игр, закончившихся на последнем шаге (до автоматического перезапуска)
+        self.final_score = np.zeros(n, dtype=np.int64)
+        self.final_ticks = np.zeros(n, dtype=np.int64)
+        self.won = np.zeros(n, dtype=bool)
+        self.reset()
+
+    def heads(self):
+        return self.body[self.env_index, self.head_ptr]
+
+    def occupied(self, idx=None):
+        """Маска (len(idx), cells): клетки, занятые телом змеи"""
+        if idx is None:
+            idx = self.env_index
+        return self.stamp[idx] > (self.moves[idx] - self.length[idx])[:, None]
+
+    def reset(self, idx=None):
+        if idx is None:
+            idx = self.env_index
+        if len(idx) == 0:
+            return
+        self.head_ptr[idx] = 0
+        self.body[idx, 0] = self.start_cell
+        self.length[idx] = 1
+        self.grow_pending[idx] = 0
+        self.direction[idx] = 0  # RIGHT
+        # Тело старой игры "выпадает" само: его метки не больше прежнего moves, а длина снова 1
+        self.moves[idx] += 1
+        self.stamp[idx, self.start_cell] = self.moves[idx]
+        self.score[idx] = 0
+        self.ticks[idx] = 0
+        self.layout[idx] = self.rng.integers(0, len(self.wall_layouts), size=len(idx))
+        self.spawn_food(idx)
+
+    @property
+    def walls(self):
+        """Маска стен (n, cells) для каждой игры"""
+        return self.wall_layouts[self.layout]
+
+    def generate_wall_layouts(self, count):
+        layouts = np.zeros((count, self.cells), dtype=bool)
+        if self.wall_count == 0:
+            return layouts
+        # Выборка без повторений для всех карт сразу: k наименьших случайных ключей в каждой строке
+        keys = self.rng.random((count, len(self.wall_candidates)))
+        chosen = np.argpartition(keys, self.wall_count - 1, axis=1)[:, :self.wall_count]
+        layouts[np.arange(count)[:, None], self.wall_candidates[chosen]] = True
+        return layouts
+
+    def spawn_food(self, idx):
+        """Ставит еду на случайную свободную клетку; возвращает маску игр, где места не осталось"""
+        full = np.zeros(len(idx), dtype=bool)
+        self.food_type[idx] = self.rng.integers(0, len(FOOD_TYPES), size=len(idx))
+        pending = np.arange(len(idx))
+        # Несколько раундов выборки с отказами (поле обычно почти пустое)...
+        for _ in range(8):
+            envs = idx[pending]
+            cand = self.rng.integers(0, self.cells, size=len(pending))
+            busy = self.wall_layouts[self.layout[envs], cand] | (self.stamp[envs, cand] > self.moves[envs] - self.length[envs])
+            self.food[envs[~busy]] = cand[~busy]
+            pending = pending[busy]
+            if len(pending) == 0:
+                return full
+        # ...а на плотном поле — точный выбор из списка свободных клеток
+        for i in pending:
+            env = idx[i]
+            free = np.flatnonzero(~self.wall_layouts[self.layout[env]] & ~self.occupied(np.array([env]))[0])
+            if len(free) == 0:
+                full[i] = True
+                self.food[env] = -1
+            else:
+                self.food[env] = free[self.rng.integers(len(free))]
+        return full
+
+    def step(self, actions):
+        """Один ход во всех играх. actions — массив индексов направлений (-1 — без изменений).
+        Возвращает (rewards, dones); у законченных игр итоги лежат в final_score/final_ticks/won."""
+        actions = np.asarray(actions, dtype=np.int64)
+        env = self.env_index
+        # Запрет разворота назад, как в Snake.steer
+        turn = (actions >= 0) & (actions != OPPOSITE_ACTION[self.direction])
+        self.direction = np.where(turn, actions, self.direction)
+
+        # Новая голова с телепортом через края
+        head = self.body[env, self.head_ptr]
+        nx = (head % self.cols + ACTION_DX[self.direction]) % self.cols
+        ny = (head // self.cols + ACTION_DY[self.direction]) % self.rows
+        new_head = ny * self.cols + nx
+
+        # Хвост снимается до проверки коллизии, если змея не растет
+        growing = self.grow_pending > 0
+        self.length += growing
+        self.grow_pending -= growing
+        self.moves += 1
+        self.ticks += 1
+
+        # Стены и собственное тело (метка старше текущего хода, но еще не "выпала" из хвоста)
+        dead = self.wall_layouts[self.layout, new_head] | (self.stamp[env, new_head] > self.moves - self.length)
+
+        self.head_ptr = (self.head_ptr + 1) % self.cells
+        self.body[env, self.head_ptr] = new_head
+        self.stamp[env, new_head] = self.moves
+
+        # Еда: очки и прирост по типу, новая еда на свободной клетке
+        ate = ~dead & (new_head == self.food)
+        rewards = np.where(ate, FOOD_POINTS[self.food_type], 0)
+        self.score += rewards
+        self.grow_pending += np.where(ate, FOOD_GROWTH[self.food_type], 0)
+        won = np.zeros(self.n, dtype=bool)
+        eaten = np.flatnonzero(ate)
+        if len(eaten):
+            won[eaten] = self.spawn_food(eaten)
+
+        dones = dead | won
+        finished = np.flatnonzero(dones)
+        if len(finished):
+            self.final_score[finished] = self.score[finished]
+            self.final_ticks[finished] = self.ticks[finished]
+            self.won[finished] = won[finished]
+            self.reset(finished)
+        return rewards, dones
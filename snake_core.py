@@ -0,0 +1,1173 @@
+# Ядро симуляции Змейки без зависимости от pygame.
+# main.py и snake_game_desktop.py — только оболочки отрисовки и ввода над ним,
+# поэтому игру можно шагать без окна: боты, серверы, прогон тысяч тиков в секунду.
+import heapq
+import math
+import random
+import struct
+from array import array
+from collections import deque
+
+from snake_ai import Pathfinder, UNREACHABLE, reachable_area, hamiltonian_cycle, hamiltonian_step
+
+# Настройки поля
+WIDTH = 600
+HEIGHT = 600
+CELL_SIZE = 20
+FOOD_TYPES = ['normal', 'gold']
+# Очки и прирост длины за каждый тип еды
+FOOD_REWARDS = {'normal': (10, 1), 'gold': (30, 3)}
+MAX_GROWTH = max(growth for _, growth in FOOD_REWARDS.values())
+POWERUP_TYPES = ['shield', 'ghost', 'magnet', 'speed', 'shrink']
+
+# Цвета змей по умолчанию
+GREEN = (0, 255, 0)
+RED = (255, 0, 0)
+BLUE = (0, 0, 255)
+SNAKE_COLORS = [GREEN, BLUE, RED, (255, 255, 0), (255, 0, 255), (0, 255, 255)]
+
+# Направления движения (в пикселях за один ход)
+UP = (0, -CELL_SIZE)
+DOWN = (0, CELL_SIZE)
+LEFT = (-CELL_SIZE, 0)
+RIGHT = (CELL_SIZE, 0)
+DIRECTIONS = [RIGHT, LEFT, DOWN, UP]
+
+# Владелец пустой клетки в сетке занятости
+NO_OWNER = -1
+# Поле больше стольких клеток — большое: сетка занятости делится на чанки (ChunkedGrid)
+LARGE_BOARD_CELLS = 1 << 16
+# Сторона чанка большого поля: 2 ** CHUNK_BITS клеток
+CHUNK_BITS = 4
+
+# Арена: сколько змей по умолчанию и сколько клеток поля приходится на змею
+ARENA_SNAKES = 100
+ARENA_CELLS_PER_SNAKE = 50
+
+# Причины смерти змеи и стратегии бота (в снимке состояния хранятся их номера)
+DEATH_CAUSES = (None, 'border', 'wall', 'self', 'snake', 'head-on')
+BOT_STRATEGIES = ('greedy', 'hamiltonian')
+
+# Снимок состояния (SnakeSimulation.snapshot): заголовок игры, генератор случайных чисел, змеи и силы.
+# Клетки (тела, стены, еда) пишутся индексами row * stride + col в массив 'H' или 'I'
+SNAPSHOT_VERSION = 5
+SNAPSHOT_HEADER = struct.Struct('<BBIHIIIBBbiBB')
+SNAPSHOT_RNG = struct.Struct('<B?d')
+SNAPSHOT_SNAKE = struct.Struct('<IqBBBBIiqqHIHB')
+SNAPSHOT_POWERUP = struct.Struct('<Bq')
+
+
+def wall_count_for_delay(move_delay):
+    # Чем быстрее уровень, тем больше стен
+    if move_delay >= 200:  # Easy
+        return 30
+    elif move_delay >= 100:  # Medium
+        return 60
+    return 120  # Hard
+
+
+def arena_field_size(snakes):
+    """Размер квадратного поля арены в пикселях: ARENA_CELLS_PER_SNAKE клеток на змею"""
+    side = math.isqrt(snakes * ARENA_CELLS_PER_SNAKE - 1) + 1
+    return side * CELL_SIZE, side * CELL_SIZE
+
+
+def forbidden_wall_cells(cols, rows):
+    """Клетки (col, row), где стены запрещены: старты змей и верхний левый угол со счетом"""
+    forbidden = {(cols // 2, rows // 2), (cols // 4, rows // 2), (3 * cols // 4, rows // 2)}
+    # Запрещаем стены в верхнем левом углу (где High Score и счета игроков)
+    for py in range(4):  # Первые 4 строки
+        for px in range(8):  # Первые 8 колонок
+            forbidden.add((px, py))
+    return forbidden
+
+
+class OccupancyGrid:
+    # Сетка занятости поля: для каждой клетки — сколько сегментов змей в ней лежит,
+    # чей сегмент зашел последним и на каком ходу этой змеи (возраст сегмента = snake.moves - stamp).
+    # Змеи обновляют ее сами в Snake.move, поэтому любая проверка столкновения — одно обращение по индексу.
+    # Заодно сетка ведет индекс свободных клеток (ни стены, ни змеи) для выбора места еды:
+    # массив free и позиция каждой клетки в нем (free_pos), удаление — перестановкой с последним,
+    # и дерево Фенвика free_tree по клеткам — k-я свободная клетка по порядку номеров за O(log n).
+    def __init__(self, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        size = cols * rows
+        self.count = [0] * size
+        self.owner = [NO_OWNER] * size
+        self.stamp = [0] * size
+        self.walls = bytearray(size)
+        self.wall_version = 0  # Растет при каждой смене стен — по нему сбрасываются кэши бота
+        self.changed = []  # Клетки, которые змеи заняли или освободили (журнал для кэша бота, очищает Pathfinder)
+        self.free = list(range(size))
+        self.free_pos = list(range(size))
+        self.build_free_tree()
+
+    def cell_index(self, x, y):
+        # Пиксельные координаты -> индекс клетки (-1 за пределами поля)
+        col = x // CELL_SIZE
+        row = y // CELL_SIZE
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row * self.cols + col
+        return -1
+
+    def set_walls(self, walls):
+        size = self.cols * self.rows
+        self.walls = bytearray(size)
+        for wall in walls:
+            cell = self.cell_index(wall[0], wall[1])
+            if cell >= 0:
+                self.walls[cell] = 1
+        self.wall_version += 1
+        # Стены меняются редко — индекс свободных клеток проще собрать заново
+        self.free = [cell for cell in range(size) if not self.walls[cell] and self.count[cell] == 0]
+        self.free_pos = [-1] * size
+        for i, cell in enumerate(self.free):
+            self.free_pos[cell] = i
+        self.build_free_tree()
+
+    def build_free_tree(self):
+        # Дерево Фенвика над флагами «клетка свободна»: tree[i] — сумма флагов клеток (i - (i & -i), i]
+        size = self.cols * self.rows
+        tree = [0] * (size + 1)
+        for cell in self.free:
+            tree[cell + 1] = 1
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.free_tree = tree
+        self.free_step = 1 << size.bit_length() - 1 if size else 0
+
+    def update_free_tree(self, cell, delta):
+        tree = self.free_tree
+        size = len(tree) - 1
+        i = cell + 1
+        while i <= size:
+            tree[i] += delta
+            i += i & -i
+
+    def nth_free_cell(self, k):
+        """k-я (с нуля) свободная клетка по порядку номеров"""
+        tree = self.free_tree
+        size = len(tree) - 1
+        pos = 0
+        step = self.free_step
+        while step:
+            i = pos + step
+            if i <= size and tree[i] <= k:
+                pos = i
+                k -= tree[i]
+            step >>= 1
+        return pos
+
+    def enter(self, cell, owner, stamp):
+        if self.count[cell] == 0:
+            self.take_free(cell)
+            self.changed.append(cell)
+        self.count[cell] += 1
+        self.owner[cell] = owner
+        self.stamp[cell] = stamp
+
+    def leave(self, cell, n=1):
+        self.count[cell] -= n
+        if self.count[cell] == 0:
+            self.owner[cell] = NO_OWNER
+            self.changed.append(cell)
+            if not self.walls[cell]:
+                self.add_free(cell)
+
+    def take_free(self, cell):
+        i = self.free_pos[cell]
+        if i < 0:
+            return
+        # Ставим последнюю свободную клетку на место удаляемой
+        last = self.free.pop()
+        if last != cell:
+            self.free[i] = last
+            self.free_pos[last] = i
+        self.free_pos[cell] = -1
+        self.update_free_tree(cell, -1)
+
+    def add_free(self, cell):
+        if self.free_pos[cell] < 0:
+            self.free_pos[cell] = len(self.free)
+            self.free.append(cell)
+            self.update_free_tree(cell, 1)
+
+    def is_free(self, cell):
+        return self.free_pos[cell] >= 0
+
+    def random_free_cell(self, rng):
+        """Случайная свободная клетка (равновероятно) или None, если поле заполнено"""
+        if not self.free:
+            return None
+        # Выбор зависит только от занятости клеток и rng, но не от порядка в списке free:
+        # игра, восстановленная из сохраненного состояния, продолжится так же, как шла.
+        # Пока поле свободно, хватает нескольких случайных проб по всем клеткам...
+        size = self.cols * self.rows
+        for _ in range(8):
+            cell = rng.randrange(size)
+            if self.is_free(cell):
+                return cell
+        # ...а на плотном поле выбираем из свободных клеток по порядку номеров (порядок в самом
+        # списке free зависит от истории игры)
+        return self.nth_free_cell(rng.randrange(len(self.free)))
+
+    def segment_age(self, cell, snake):
+        """Сколько ходов назад голова змеи зашла в клетку (None, если последней там была не она)"""
+        if self.owner[cell] != snake.id:
+            return None
+        return snake.moves - self.stamp[cell]
+
+
+class GridChunk:
+    # Квадрат поля 2 ** CHUNK_BITS клеток со своими массивами занятости
+    __slots__ = ('count', 'owner', 'stamp', 'walls', 'used')
+
+    def __init__(self):
+        size = 1 << 2 * CHUNK_BITS
+        self.count = [0] * size
+        self.owner = [NO_OWNER] * size
+        self.stamp = [0] * size
+        self.walls = bytearray(size)
+        self.used = 0  # Сколько клеток чанка заняты змеями или стенами
+
+
+class ChunkLayer:
+    # Один из массивов сетки по всем чанкам сразу: grid.count[cell], grid.walls[cell] — как у OccupancyGrid.
+    # В клетке, для которой чанк не заведен, — значение по умолчанию
+    __slots__ = ('grid', 'name', 'default')
+
+    def __init__(self, grid, name, default):
+        self.grid = grid
+        self.name = name
+        self.default = default
+
+    def __getitem__(self, cell):
+        key, local = self.grid.locate(cell)
+        chunk = self.grid.chunks.get(key)
+        if chunk is None:
+            return self.default
+        return getattr(chunk, self.name)[local]
+
+
+class ChunkedGrid:
+    # Сетка занятости большого поля (больше LARGE_BOARD_CELLS клеток, например 1000×1000) с тем же
+    # интерфейсом, что у OccupancyGrid. Поле поделено на чанки, и массивы есть только у чанков,
+    # где лежат змеи или стены; опустевший чанк удаляется. Поэтому память и работа за тик растут
+    # с числом занятых клеток, а не с площадью поля. Индекса свободных клеток нет: на почти пустом
+    # поле еду находят случайные пробы, а на плотном — подсчет свободных клеток по чанкам.
+    def __init__(self, cols, rows):
+        self.cols = cols
+        self.rows = rows
+        side = 1 << CHUNK_BITS
+        self.chunk_cols = (cols + side - 1) >> CHUNK_BITS
+        self.chunk_rows = (rows + side - 1) >> CHUNK_BITS
+        self.chunks = {}  # Номер чанка (строка * chunk_cols + столбец) -> GridChunk
+        self.taken = 0  # Сколько клеток поля заняты змеями или стенами
+        self.wall_cells = []
+        self.wall_version = 0
+        self.changed = []
+        self.count = ChunkLayer(self, 'count', 0)
+        self.owner = ChunkLayer(self, 'owner', NO_OWNER)
+        self.stamp = ChunkLayer(self, 'stamp', 0)
+        self.walls = ChunkLayer(self, 'walls', 0)
+
+    def cell_index(self, x, y):
+        # Пиксельные координаты -> индекс клетки (-1 за пределами поля)
+        col = x // CELL_SIZE
+        row = y // CELL_SIZE
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return row * self.cols + col
+        return -1
+
+    def locate(self, cell):
+        """Номер чанка клетки и ее номер внутри чанка"""
+        row, col = divmod(cell, self.cols)
+        mask = (1 << CHUNK_BITS) - 1
+        return ((row >> CHUNK_BITS) * self.chunk_cols + (col >> CHUNK_BITS),
+                (row & mask) << CHUNK_BITS | col & mask)
+
+    def chunk(self, key):
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = GridChunk()
+        return chunk
+
+    def take(self, chunk):
+        chunk.used += 1
+        self.taken += 1
+
+    def free_cell(self, key, chunk):
+        chunk.used -= 1
+        self.taken -= 1
+        if chunk.used == 0:
+            del self.chunks[key]
+
+    def set_walls(self, walls):
+        # Снимаем старые стены и ставим новые: работа по числу стен, а не по площади поля
+        for cell in self.wall_cells:
+            key, local = self.locate(cell)
+            chunk = self.chunks[key]
+            chunk.walls[local] = 0
+            if chunk.count[local] == 0:
+                self.free_cell(key, chunk)
+        self.wall_cells = []
+        for wall in walls:
+            cell = self.cell_index(wall[0], wall[1])
+            if cell < 0:
+                continue
+            key, local = self.locate(cell)
+            chunk = self.chunk(key)
+            if chunk.walls[local]:
+                continue
+            if chunk.count[local] == 0:
+                self.take(chunk)
+            chunk.walls[local] = 1
+            self.wall_cells.append(cell)
+        self.wall_version += 1
+
+    def enter(self, cell, owner, stamp):
+        key, local = self.locate(cell)
+        chunk = self.chunk(key)
+        if chunk.count[local] == 0:
+            self.changed.append(cell)
+            if not chunk.walls[local]:
+                self.take(chunk)
+        chunk.count[local] += 1
+        chunk.owner[local] = owner
+        chunk.stamp[local] = stamp
+
+    def leave(self, cell, n=1):
+        key, local = self.locate(cell)
+        chunk = self.chunks[key]
+        chunk.count[local] -= n
+        if chunk.count[local] == 0:
+            chunk.owner[local] = NO_OWNER
+            self.changed.append(cell)
+            if not chunk.walls[local]:
+                self.free_cell(key, chunk)
+
+    def is_free(self, cell):
+        row, col = divmod(cell, self.cols)
+        mask = (1 << CHUNK_BITS) - 1
+        chunk = self.chunks.get((row >> CHUNK_BITS) * self.chunk_cols + (col >> CHUNK_BITS))
+        if chunk is None:
+            return True
+        local = (row & mask) << CHUNK_BITS | col & mask
+        return not (chunk.count[local] or chunk.walls[local])
+
+    def random_free_cell(self, rng):
+        """Случайная свободная клетка (равновероятно) или None, если поле заполнено"""
+        size = self.cols * self.rows
+        free = size - self.taken
+        if free == 0:
+            return None
+        # Как у OccupancyGrid: сначала несколько проб по всем клеткам...
+        for _ in range(8):
+            cell = rng.randrange(size)
+            if self.is_free(cell):
+                return cell
+        # ...а на плотном поле — k-я свободная клетка: чанки по порядку номеров, внутри — по строкам.
+        # Чанк, где свободных клеток меньше k, пропускается целиком
+        k = rng.randrange(free)
+        side = 1 << CHUNK_BITS
+        for key in range(self.chunk_cols * self.chunk_rows):
+            row0 = key // self.chunk_cols * side
+            col0 = key % self.chunk_cols * side
+            width = min(side, self.cols - col0)
+            height = min(side, self.rows - row0)
+            chunk = self.chunks.get(key)
+            chunk_free = width * height - (chunk.used if chunk is not None else 0)
+            if k >= chunk_free:
+                k -= chunk_free
+                continue
+            for y in range(height):
+                for x in range(width):
+                    local = y << CHUNK_BITS | x
+                    if chunk is None or not (chunk.count[local] or chunk.walls[local]):
+                        if k == 0:
+                            return (row0 + y) * self.cols + col0 + x
+                        k -= 1
+        return None
+
+    def segment_age(self, cell, snake):
+        """Сколько ходов назад голова змеи зашла в клетку (None, если последней там была не она)"""
+        if self.owner[cell] != snake.id:
+            return None
+        return snake.moves - self.stamp[cell]
+
+
+class Snake:
+    def __init__(self, start_pos, direction, color, controls=None, is_bot=False):
+        # Тело — deque: голова добавляется слева, хвост снимается справа за O(1) при любой длине
+        self.body = deque([start_pos])
+        self.direction = direction
+        self.next_direction = direction  # Буфер для следующего направления
+        self.direction_changed = False  # Флаг для предотвращения множественных изменений
+        self.color = color
+        self.controls = controls or {}
+        self.is_bot = is_bot
+        self.grow_pending = 0
+        self.alive = True
+        self.death_cause = None  # Отчего умерла: 'border', 'wall', 'self', 'snake', 'head-on'
+        self.score = 0
+        self.bot_speedup = False  # Бот решает сам когда ускоряться
+        # Свое расписание у каждой змеи: скорость, ускорение и сила 'speed' (см. current_delay)
+        self.move_delay = 100  # Мс между ходами без ускорений (задает симуляция)
+        self.boost = False  # Игрок держит клавишу ускорения
+        self.last_move_time = 0
+        self.next_move_time = 0
+        # Power-up система
+        self.apples_collected = 0  # Счетчик собранных яблок
+        self.active_powerups = []  # Список активных power-ups: [{'type': 'shield', 'end_time': time}, ...]
+        self.invincible = False  # Неуязвимость
+        self.ghost_mode = False  # Проход сквозь стены
+        self.magnet_range = 0  # Радиус притяжения яблок (0 = выключено)
+        self.speed_mode = False  # Сила 'speed': ходит вдвое чаще
+        # Сетка занятости (подключает симуляция)
+        self.grid = None
+        self.id = NO_OWNER
+        self.moves = 0  # Сколько ходов сделала змея — метка времени для сегментов в сетке
+        self.cell_counts = {}  # Клетка -> сколько сегментов этой змеи в ней лежит
+
+    def get_head(self):
+        return self.body[0]
+
+    def current_delay(self):
+        """Через сколько мс после хода змея ходит снова"""
+        delay = self.move_delay
+        if self.speed_mode:
+            delay = max(10, delay // 2)
+        if self.bot_speedup if self.is_bot else self.boost:
+            delay //= 2
+        return delay
+
+    def set_direction(self, key):
+        # key — любой код клавиши из self.controls (оболочка передает pygame.K_*)
+        if key in self.controls:
+            self.steer(self.controls[key])
+
+    def steer(self, new_dir):
+        if self.direction_changed:
+            return
+        # Запретить разворот назад (проверяем против текущего direction)
+        if (new_dir[0] != -self.direction[0] or new_dir[1] != -self.direction[1]):
+            self.next_direction = new_dir
+            self.direction_changed = True
+
+    def move(self, wrap_around=False, field_width=None, field_height=None):
+        if field_width is None:
+            field_width = WIDTH
+        if field_height is None:
+            field_height = HEIGHT
+        # Применяем буферизованное направление
+        self.direction = self.next_direction
+        self.direction_changed = False  # Сбрасываем флаг после применения
+        head_x, head_y = self.body[0]
+        dx, dy = self.direction
+        new_head = (head_x + dx, head_y + dy)
+        if wrap_around:
+            new_head = (new_head[0] % field_width, new_head[1] % field_height)
+        # Если не растём, удаляем хвост перед проверкой коллизии, чтобы не умирать на месте после еды
+        if self.grow_pending == 0:
+            self.pop_tail()
+        self.moves += 1
+        self.body.appendleft(new_head)
+        if self.grid is not None:
+            self.occupy_cell(self.grid.cell_index(new_head[0], new_head[1]), self.moves)
+        if self.grow_pending > 0:
+            self.grow_pending -= 1
+
+    def pop_tail(self):
+        tail = self.body.pop()
+        if self.grid is not None:
+            self.vacate_cell(self.grid.cell_index(tail[0], tail[1]))
+        return tail
+
+    def grow(self, n=1):
+        self.grow_pending += n
+
+    def attach_grid(self, grid, snake_id):
+        """Регистрирует тело змеи в сетке занятости"""
+        self.grid = grid
+        self.id = snake_id
+        self.cell_counts = {}
+        # От хвоста к голове, чтобы последней в клетку "зашла" голова
+        stamp = self.moves - len(self.body) + 1
+        for segment in reversed(self.body):
+            self.occupy_cell(grid.cell_index(segment[0], segment[1]), stamp)
+            stamp += 1
+
+    def occupy_cell(self, cell, stamp):
+        if cell < 0:
+            return
+        self.grid.enter(cell, self.id, stamp)
+        self.cell_counts[cell] = self.cell_counts.get(cell, 0) + 1
+
+    def vacate_cell(self, cell):
+        n = self.cell_counts.get(cell, 0)
+        if n == 0:
+            return
+        if n > 1:
+            self.cell_counts[cell] = n - 1
+        else:
+            del self.cell_counts[cell]
+        self.grid.leave(cell)
+
+    def release(self):
+        """Убирает тело змеи из сетки: мертвые змеи не участвуют в столкновениях"""
+        for cell, n in self.cell_counts.items():
+            self.grid.leave(cell, n)
+        self.cell_counts = {}
+
+    def die(self, cause=None):
+        self.alive = False
+        self.death_cause = cause
+        if self.grid is not None:
+            self.release()
+
+    def pack(self, out, stride, cell_code):
+        """Дописывает состояние змеи в снимок out (без сетки — ее собирает симуляция)"""
+        flags = (self.direction_changed | self.is_bot << 1 | self.alive << 2 | self.bot_speedup << 3
+                 | self.invincible << 4 | self.ghost_mode << 5 | self.boost << 6 | self.speed_mode << 7)
+        out += SNAPSHOT_SNAKE.pack(
+            len(self.body), self.moves, DIRECTIONS.index(self.direction), DIRECTIONS.index(self.next_direction),
+            flags, DEATH_CAUSES.index(self.death_cause), self.grow_pending, self.score, self.last_move_time,
+            self.next_move_time, self.move_delay, self.apples_collected, self.magnet_range, len(self.active_powerups))
+        for powerup in self.active_powerups:
+            out += SNAPSHOT_POWERUP.pack(POWERUP_TYPES.index(powerup['type']), powerup['end_time'])
+        # Тело от головы к хвосту
+        out += array(cell_code, [y // CELL_SIZE * stride + x // CELL_SIZE for x, y in self.body]).tobytes()
+
+    def unpack(self, data, pos, stride, cell_code):
+        """Читает состояние змеи из снимка с позиции pos; возвращает позицию за ним"""
+        (length, self.moves, direction, next_direction, flags, death_cause, self.grow_pending, self.score,
+         self.last_move_time, self.next_move_time, self.move_delay, self.apples_collected, self.magnet_range,
+         powerups) = SNAPSHOT_SNAKE.unpack_from(data, pos)
+        pos += SNAPSHOT_SNAKE.size
+        self.direction = DIRECTIONS[direction]
+        self.next_direction = DIRECTIONS[next_direction]
+        self.direction_changed = bool(flags & 1)
+        self.is_bot = bool(flags & 2)
+        self.alive = bool(flags & 4)
+        self.bot_speedup = bool(flags & 8)
+        self.invincible = bool(flags & 16)
+        self.ghost_mode = bool(flags & 32)
+        self.boost = bool(flags & 64)
+        self.speed_mode = bool(flags & 128)
+        self.death_cause = DEATH_CAUSES[death_cause]
+        self.active_powerups = []
+        for _ in range(powerups):
+            kind, end_time = SNAPSHOT_POWERUP.unpack_from(data, pos)
+            pos += SNAPSHOT_POWERUP.size
+            self.active_powerups.append({'type': POWERUP_TYPES[kind], 'end_time': end_time})
+        cells = array(cell_code)
+        end = pos + length * cells.itemsize
+        cells.frombytes(data[pos:end])
+        self.body = deque((cell % stride * CELL_SIZE, cell // stride * CELL_SIZE) for cell in cells)
+        return end
+
+    def check_collision(self, walls_enabled=True, field_width=None, field_height=None, wrap_around=False, other_heads=0):
+        """other_heads — сколько голов других змей, сходивших на этом тике, в клетке головы:
+        это лобовое столкновение, его засчитывает SnakeSimulation.step"""
+        head = self.get_head()
+        if field_width is None:
+            field_width = WIDTH
+        if field_height is None:
+            field_height = HEIGHT
+
+        # Проверка неуязвимости
+        if self.invincible:
+            return  # Не умираем от столкновений
+
+        # Границы убивают только если wrap_around == False и нет ghost_mode
+        if not wrap_around and not self.ghost_mode:
+            if head[0] < 0 or head[0] >= field_width or head[1] < 0 or head[1] >= field_height:
+                self.die('border')
+                return
+        cell = self.grid.cell_index(head[0], head[1])
+        if cell < 0:
+            return
+        # Серые стены убивают только если walls_enabled=True и нет ghost_mode
+        if walls_enabled and self.grid.walls[cell] and not self.ghost_mode:
+            self.die('wall')
+            return
+        own = self.cell_counts.get(cell, 0)
+        # Проверка столкновения с собой (бот умеет обходить себя и от себя не умирает)
+        if not self.is_bot and own > 1:
+            self.die('self')
+            return
+        # Проверка столкновения с другими живыми змеями: в клетке есть чужие сегменты, кроме голов сходивших змей
+        if self.grid.count[cell] > own + other_heads:
+            self.die('snake')
+            return
+
+
+class SnakeSimulation:
+    # Класс змеи, который создает симуляция (оболочки подставляют свой, с отрисовкой)
+    snake_class = Snake
+
+    def __init__(self, move_delay, snake_color, mode='single', bot_color=BLUE, walls_type="Frame walls",
+                 p1_controls=None, p2_controls=None, field_width=WIDTH, field_height=HEIGHT, seed=None,
+                 arena_snakes=ARENA_SNAKES):
+        # Запретить совпадение цветов змеи и бота
+        if bot_color == snake_color:
+            alt_colors = [c for c in SNAKE_COLORS if c != snake_color]
+            bot_color = alt_colors[0]
+        # Свой генератор случайных чисел: вся случайность игры (стены, еда, силы, бот) идет через него,
+        # поэтому по seed и записанному вводу игру можно повторить тик в тик
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.rng = random.Random(self.seed)
+        self.replay = None  # Запись повтора (snake_replay.ReplayRecorder), подключает оболочка
+        self.move_delay = move_delay
+        self.snake_color = snake_color
+        self.mode = mode
+        self.bot_color = bot_color
+        self.walls_type = walls_type
+        # Размер поля в пикселях (в оболочке — размер окна или заданный размер большого поля)
+        self.field_width = field_width
+        self.field_height = field_height
+        # Генерация стен: случайно по всему полю, не по периметру, с учетом размера поля
+        self.grid = None
+        self.pathfinder = None
+        self.tick = 0  # Номер тика симуляции
+        # Стратегия бота: 'greedy' — к цели в обход препятствий, 'hamiltonian' — по гамильтонову циклу
+        # (для демо: на поле без стен с единственной змеей доходит до заполненного поля)
+        self.bot_strategy = 'greedy'
+        self.walls = set()
+        self.regenerate_walls()
+        # Игроки
+        self.snakes = []
+        p1_controls = p1_controls or {}
+        p2_controls = p2_controls or {}
+        # Стартовые клетки совпадают с клетками, где стены запрещены
+        cols = self.field_width // CELL_SIZE
+        rows = self.field_height // CELL_SIZE
+        center = (cols // 2 * CELL_SIZE, rows // 2 * CELL_SIZE)
+        left = (cols // 4 * CELL_SIZE, rows // 2 * CELL_SIZE)
+        right = (3 * cols // 4 * CELL_SIZE, rows // 2 * CELL_SIZE)
+        if mode in ('single', 'power-up'):
+            # Объединяем оба набора для одиночной игры (Power-Up — одиночная игра с системой способностей)
+            controls = {**p1_controls, **p2_controls}
+            self.snakes.append(self.snake_class(center, RIGHT, snake_color, controls=controls))
+        elif mode == 'pvp':
+            self.snakes.append(self.snake_class(left, RIGHT, snake_color, controls=p2_controls))
+            self.snakes.append(self.snake_class(right, LEFT, self.bot_color, controls=p1_controls))
+        elif mode == 'bot':
+            # Объединяем оба набора для режима с ботом
+            controls = {**p1_controls, **p2_controls}
+            self.snakes.append(self.snake_class(left, RIGHT, snake_color, controls=controls))
+            self.snakes.append(self.snake_class(right, LEFT, self.bot_color, is_bot=True))
+        elif mode == 'arena':
+            # Арена: змея игрока и arena_snakes - 1 ботов на случайных свободных клетках
+            controls = {**p1_controls, **p2_controls}
+            bot_colors = [c for c in SNAKE_COLORS if c != snake_color]
+            taken = set(self.walls)
+            count = min(arena_snakes, cols * rows - len(taken))
+            while len(self.snakes) < count:
+                pos = (self.rng.randrange(cols) * CELL_SIZE, self.rng.randrange(rows) * CELL_SIZE)
+                if pos in taken:
+                    continue
+                taken.add(pos)
+                direction = self.rng.choice(DIRECTIONS)
+                if not self.snakes:
+                    self.snakes.append(self.snake_class(pos, direction, snake_color, controls=controls))
+                else:
+                    color = bot_colors[(len(self.snakes) - 1) % len(bot_colors)]
+                    self.snakes.append(self.snake_class(pos, direction, color, is_bot=True))
+        # Расписание ходов: куча (время хода, индекс змеи); ход делают только змеи, чье время пришло
+        for snake in self.snakes:
+            snake.move_delay = move_delay
+            snake.next_move_time = snake.current_delay()
+        self.schedule = []
+        self.rebuild_grid()
+        self.rebuild_schedule()
+        self.food = self.random_food()
+        self.game_over = False
+        self.board_full = False  # Поле заполнено целиком (победа)
+        self.events = []  # Звуковые события последнего тика
+
+        # Power-Up система
+        self.powerup_selection_mode = False  # Режим выбора силы
+        self.available_powerups = []  # Список доступных сил для выбора
+        self.selected_powerup_index = 0  # Индекс выбранной силы
+
+    def set_field_size(self, field_width, field_height):
+        if self.replay is not None:
+            self.replay.record_event('set_field_size', field_width, field_height)
+        self.field_width = field_width
+        self.field_height = field_height
+        self.rebuild_grid()
+
+    def snapshot(self):
+        """Полное состояние игры компактным бинарным снимком; restore продолжит с него игру тик в тик.
+        Дешев настолько, что его можно снимать каждый тик: пауза и продолжение, откат, копии для поиска ботом"""
+        cells = [(x, y) for snake in self.snakes for x, y in snake.body]
+        cells.extend(self.walls)
+        if self.food is not None:
+            cells.append(self.food['pos'])
+        # Ширина строки с запасом на клетки за правым краем (после уменьшения поля)
+        stride = max([self.grid.cols] + [x // CELL_SIZE + 1 for x, _ in cells])
+        rows = max([self.grid.rows] + [y // CELL_SIZE + 1 for _, y in cells])
+        cell_code = 'H' if stride * rows <= 0xFFFF else 'I'
+        food_cell = -1
+        food_type = 0
+        if self.food is not None:
+            food_cell = self.food['pos'][1] // CELL_SIZE * stride + self.food['pos'][0] // CELL_SIZE
+            food_type = FOOD_TYPES.index(self.food['type'])
+        flags = self.game_over | self.board_full << 1 | self.powerup_selection_mode << 2
+
+        out = bytearray(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_VERSION, ord(cell_code), self.tick, self.move_delay, self.field_width, self.field_height,
+            stride, flags, BOT_STRATEGIES.index(self.bot_strategy), self.selected_powerup_index,
+            food_cell, food_type, len(self.available_powerups)))
+        out += bytes(POWERUP_TYPES.index(powerup) for powerup in self.available_powerups)
+        out += struct.pack('<I', len(self.walls))
+        out += array(cell_code, sorted(y // CELL_SIZE * stride + x // CELL_SIZE for x, y in self.walls)).tobytes()
+        # Генератор случайных чисел (Mersenne Twister: 624 слова и позиция)
+        version, internal, gauss = self.rng.getstate()
+        out += SNAPSHOT_RNG.pack(version, gauss is not None, gauss or 0.0)
+        out += array('I', internal).tobytes()
+        out += struct.pack('<H', len(self.snakes))
+        for snake in self.snakes:
+            snake.pack(out, stride, cell_code)
+        return bytes(out)
+
+    def restore(self, data):
+        """Восстанавливает игру из снимка snapshot() (змей столько же и в том же порядке)"""
+        (version, cell_code, self.tick, self.move_delay, self.field_width, self.field_height, stride, flags,
+         strategy, self.selected_powerup_index, food_cell, food_type, powerups) = SNAPSHOT_HEADER.unpack_from(data, 0)
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'unsupported snapshot version: {version}')
+        cell_code = chr(cell_code)
+        pos = SNAPSHOT_HEADER.size
+        self.game_over = bool(flags & 1)
+        self.board_full = bool(flags & 2)
+        self.powerup_selection_mode = bool(flags & 4)
+        self.bot_strategy = BOT_STRATEGIES[strategy]
+        self.available_powerups = [POWERUP_TYPES[i] for i in data[pos:pos + powerups]]
+        pos += powerups
+        self.food = None
+        if food_cell >= 0:
+            self.food = {'pos': (food_cell % stride * CELL_SIZE, food_cell // stride * CELL_SIZE),
+                         'type': FOOD_TYPES[food_type]}
+
+        walls = array(cell_code)
+        count, = struct.unpack_from('<I', data, pos)
+        pos += 4
+        walls.frombytes(data[pos:pos + count * walls.itemsize])
+        pos += count * walls.itemsize
+        self.walls = {(cell % stride * CELL_SIZE, cell // stride * CELL_SIZE) for cell in walls}
+
+        version, has_gauss, gauss = SNAPSHOT_RNG.unpack_from(data, pos)
+        pos += SNAPSHOT_RNG.size
+        internal = array('I')
+        internal.frombytes(data[pos:pos + 625 * internal.itemsize])
+        pos += 625 * internal.itemsize
+        self.rng.setstate((version, tuple(internal), gauss if has_gauss else None))
+
+        count, = struct.unpack_from('<H', data, pos)
+        pos += 2
+        if count != len(self.snakes):
+            raise ValueError('snapshot has a different number of snakes')
+        for snake in self.snakes:
+            pos = snake.unpack(data, pos, stride, cell_code)
+        self.rebuild_grid()
+        self.rebuild_schedule()
+
+    def rebuild_schedule(self):
+        """Собирает кучу расписания заново по next_move_time змей"""
+        self.schedule = [(snake.next_move_time, i) for i, snake in enumerate(self.snakes) if snake.alive]
+        heapq.heapify(self.schedule)
+
+    def reschedule(self, snake):
+        """Переносит следующий ход змеи после смены ее скорости или после хода.
+        Старая запись остается в куче и при извлечении пропускается: ее время уже не next_move_time"""
+        snake.next_move_time = snake.last_move_time + snake.current_delay()
+        heapq.heappush(self.schedule, (snake.next_move_time, snake.id))
+
+    def next_move_time(self):
+        """Игровое время ближайшего хода (None, если ходить некому)"""
+        schedule = self.schedule
+        while schedule:
+            time, index = schedule[0]
+            snake = self.snakes[index]
+            if snake.alive and time == snake.next_move_time:
+                return time
+            heapq.heappop(schedule)
+        return None
+
+    def set_boost(self, index, boost):
+        """Ускорение змеи игрока (клавиша зажата или отпущена)"""
+        snake = self.snakes[index]
+        if snake.boost == boost:
+            return
+        if self.replay is not None:
+            self.replay.record_event('set_boost', index, boost)
+        snake.boost = boost
+        self.reschedule(snake)
+
+    def rebuild_grid(self):
+        """Пересобирает сетку занятости под текущий размер поля"""
+        cols = self.field_width // CELL_SIZE
+        rows = self.field_height // CELL_SIZE
+        # Большое поле — разреженная сетка по чанкам, обычное — плотные массивы на все клетки
+        grid_class = ChunkedGrid if cols * rows > LARGE_BOARD_CELLS else OccupancyGrid
+        self.grid = grid_class(cols, rows)
+        # Геометрия поля: края выровнены по сетке, чтобы телепорт не сбивал змей с клеток.
+        # Считается только здесь (смена размера поля), а не на каждом тике
+        self.grid_width = self.grid.cols * CELL_SIZE
+        self.grid_height = self.grid.rows * CELL_SIZE
+        self.grid.set_walls(self.walls)
+        self.pathfinder = Pathfinder(self.grid)
+        for i, snake in enumerate(self.snakes):
+            snake.attach_grid(self.grid, i)
+            if not snake.alive:
+                snake.release()
+
+    def resize(self, field_width, field_height):
+        """Меняет размер поля: стены и еда генерируются заново"""
+        if self.replay is not None:
+            self.replay.record_event('resize', field_width, field_height)
+        self.field_width = field_width
+        self.field_height = field_height
+        self.rebuild_grid()
+        self.regenerate_walls()
+        self.food = self.random_food()
+
+    def regenerate_walls(self):
+        # Перегенерировать стены при изменении размера поля.
+        # Стены хранятся во множестве (проверка "есть ли стена" за O(1)), а в сетке — битовой картой
+        self.walls = set()
+        if self.walls_type == "With walls":
+            screen_w = (self.field_width // CELL_SIZE)
+            screen_h = (self.field_height // CELL_SIZE)
+            wall_count = wall_count_for_delay(self.move_delay)
+            forbidden = {(x * CELL_SIZE, y * CELL_SIZE) for x, y in forbidden_wall_cells(screen_w, screen_h)}
+
+            # Выборка без повторений из внутренних клеток (не по периметру): rng.sample по range
+            # не строит список клеток, берем с запасом на запрещенные и отбрасываем их.
+            # Ни бесконечного перебора на маленьком поле, ни дублей стен
+            inner_w = max(0, screen_w - 2)
+            inner_h = max(0, screen_h - 2)
+            inner = inner_w * inner_h
+            for i in self.rng.sample(range(inner), min(inner, wall_count + len(forbidden))):
+                pos = ((1 + i % inner_w) * CELL_SIZE, (1 + i // inner_w) * CELL_SIZE)
+                if pos not in forbidden:
+                    self.walls.add(pos)
+                    if len(self.walls) == wall_count:
+                        break
+        if self.grid is not None:
+            self.grid.set_walls(self.walls)
+
+    def random_food(self):
+        # Еда появляется только на свободной клетке; None — свободных клеток не осталось
+        cell = self.grid.random_free_cell(self.rng)
+        if cell is None:
+            return None
+        pos = (cell % self.grid.cols * CELL_SIZE, cell // self.grid.cols * CELL_SIZE)
+        food_type = self.rng.choice(FOOD_TYPES)
+        return {'pos': pos, 'type': food_type}
+
+    def apply_powerup(self, powerup_type, now_ms=0):
+        """Применяет выбранную силу к змее игрока"""
+        if self.replay is not None:
+            self.replay.record_event('apply_powerup', powerup_type, now_ms)
+        snake = self.snakes[0]  # Игрок всегда первая змея в power-up режиме
+        current_time = now_ms
+
+        if powerup_type == 'shield':
+            # Неуязвимость на 10 секунд
+            snake.invincible = True
+            snake.active_powerups.append({'type': 'shield', 'end_time': current_time + 10000})
+        elif powerup_type == 'ghost':
+            # Проход сквозь стены на 8 секунд
+            snake.ghost_mode = True
+            snake.active_powerups.append({'type': 'ghost', 'end_time': current_time + 8000})
+        elif powerup_type == 'magnet':
+            # Магнит притягивает яблоки на 12 секунд
+            snake.magnet_range = 150  # радиус притяжения в пикселях
+            snake.active_powerups.append({'type': 'magnet', 'end_time': current_time + 12000})
+        elif powerup_type == 'speed':
+            # Ускорение на 7 секунд — только этой змеи, у остальных свое расписание
+            snake.speed_mode = True
+            snake.active_powerups.append({'type': 'speed', 'end_time': current_time + 7000})
+            self.reschedule(snake)
+        elif powerup_type == 'shrink':
+            # Уменьшить змею на 3 сегмента (минимум 1)
+            segments_to_remove = min(3, len(snake.body) - 1)
+            for _ in range(segments_to_remove):
+                if len(snake.body) > 1:
+                    snake.pop_tail()
+
+    def eat_food(self, snake):
+        food_type = self.food['type']
+        points, growth = FOOD_REWARDS[food_type]
+        self.events.append('golden' if food_type == 'gold' else 'eat')
+
+        snake.score += points
+        snake.grow(growth)
+
+        # Power-Up режим: счетчик яблок
+        if self.mode == 'power-up':
+            snake.apples_collected += 1
+            if snake.apples_collected % 3 == 0:
+                # Каждые 3 яблока - выбор силы
+                # НЕ останавливаем игру - можно выбирать на ходу!
+                self.powerup_selection_mode = True
+                # Генерируем 3 случайные силы
+                self.available_powerups = self.rng.sample(POWERUP_TYPES, 3)
+                self.selected_powerup_index = 0
+
+        self.food = self.random_food()
+        if self.food is None:
+            # Змеи заняли все поле — это победа, а не бесконечный поиск места для еды
+            self.board_full = True
+            self.game_over = True
+
+    def step(self, inputs=None, now_ms=0):
+        """Один тик игры. inputs — {индекс змеи: направление}, now_ms — игровое время в мс.
+        Возвращает список звуковых событий тика: 'eat', 'golden', 'death'."""
+        self.events = []
+        if inputs:
+            for index, direction in inputs.items():
+                self.snakes[index].steer(direction)
+        if self.replay is not None:
+            self.replay.record_tick(self, now_ms)
+        self.tick += 1
+        # Журнал занятых и освободившихся клеток прошлого тика — в кэш полей бота
+        self.pathfinder.collect()
+
+        field_width = self.grid_width
+        field_height = self.grid_height
+        # Серые стены убивают только в режиме "With walls"
+        walls_enabled = (self.walls_type == 'With walls')
+        # Телепортация через края работает всегда
+        wrap_around = True
+
+        # Ходят только змеи, чье время пришло: снимаем их с вершины кучи расписания.
+        # Устаревшие записи (змея погибла или сменила скорость) пропускаем
+        due = set()
+        schedule = self.schedule
+        while schedule and schedule[0][0] <= now_ms:
+            time, index = heapq.heappop(schedule)
+            snake = self.snakes[index]
+            if snake.alive and time == snake.next_move_time:
+                due.add(index)
+        moved = [self.snakes[index] for index in sorted(due)]
+
+        # Сначала боты выбирают ход и ходят, потом ходят игроки
+        for snake in moved:
+            if snake.is_bot:
+                self.bot_move(snake)
+                snake.move(wrap_around=wrap_around, field_width=field_width, field_height=field_height)
+        for snake in moved:
+            if not snake.is_bot:
+                snake.move(wrap_around=wrap_around, field_width=field_width, field_height=field_height)
+        # Следующий ход — через задержку от этого (у бота она зависит от только что принятого bot_speedup)
+        for snake in moved:
+            snake.last_move_time = now_ms
+            self.reschedule(snake)
+
+        # Лобовые столкновения — за один проход: сходившие змеи по клеткам голов, а не перебор всех пар.
+        # Головы собираются до проверки столкновений, чтобы чужая голова не считалась телом
+        heads = {}
+        for snake in moved:
+            if snake.alive:
+                heads.setdefault(snake.get_head(), []).append(snake)
+
+        # Столкнуться и съесть еду могут только сходившие змеи
+        for snake in moved:
+            if not snake.alive:
+                continue
+            snake.check_collision(
+                walls_enabled=walls_enabled,
+                field_width=field_width,
+                field_height=field_height,
+                wrap_around=wrap_around,
+                other_heads=sum(other.alive for other in heads[snake.get_head()]) - 1
+            )
+        # Проверяем сбор яблока только живыми змеями
+        for snake in moved:
+            if not snake.alive or self.food is None:
+                continue
+            head = snake.get_head()
+            head_grid = (head[0] // CELL_SIZE * CELL_SIZE, head[1] // CELL_SIZE * CELL_SIZE)
+            food_grid = (self.food['pos'][0] // CELL_SIZE * CELL_SIZE, self.food['pos'][1] // CELL_SIZE * CELL_SIZE)
+
+            # Проверка магнита (power-up) - собираем яблоко на расстоянии, не притягивая
+            if snake.magnet_range > 0:
+                distance = ((head[0] - self.food['pos'][0])**2 + (head[1] - self.food['pos'][1])**2)**0.5
+                if distance <= snake.magnet_range:
+                    self.eat_food(snake)
+                    break  # Выходим из цикла, яблоко собрано
+
+            # Обычный сбор яблока при контакте
+            if head_grid == food_grid:
+                self.eat_food(snake)
+
+        # Обновление активных power-ups (проверка истечения времени)
+        if self.mode == 'power-up':
+            snake = self.snakes[0]
+            expired = []
+            for powerup in snake.active_powerups:
+                if now_ms >= powerup['end_time']:
+                    expired.append(powerup)
+                    # Отключаем эффект
+                    if powerup['type'] == 'shield':
+                        snake.invincible = False
+                    elif powerup['type'] == 'ghost':
+                        snake.ghost_mode = False
+                    elif powerup['type'] == 'magnet':
+                        snake.magnet_range = 0
+                    elif powerup['type'] == 'speed':
+                        snake.speed_mode = False
+                        self.reschedule(snake)
+            for powerup in expired:
+                snake.active_powerups.remove(powerup)
+
+        alive = [snake for snake in self.snakes if snake.alive]
+        if not alive:
+            self.events.append('death')
+            self.game_over = True
+        for group in heads.values():
+            if len(group) > 1:
+                for snake in group:
+                    if snake.alive:
+                        snake.die('head-on')
+                self.events.append('death')
+        if self.mode in ('single', 'bot', 'pvp', 'power-up'):
+            if not self.snakes[0].alive or (len(self.snakes) > 1 and not self.snakes[1].alive):
+                self.events.append('death')
+                self.game_over = True
+        elif self.mode == 'arena':
+            # Арена кончается со смертью змеи игрока или когда в живых осталась одна змея
+            if not self.snakes[0].alive or (len(self.snakes) > 1 and sum(s.alive for s in alive) <= 1):
+                self.events.append('death')
+                self.game_over = True
+        return self.events
+
+    def bot_move(self, snake):
+        # Бот: идёт к еде, умеет обходить стены
+        if self.bot_strategy == 'hamiltonian' and self.hamiltonian_move(snake):
+            return
+        head = snake.get_head()
+        fx, fy = self.food['pos'] if self.food is not None else head
+        # Соперник — первая другая змея (в одиночной игре бот "соперничает" сам с собой)
+        player = next((s for s in self.snakes if s is not snake), snake)
+        px, py = player.get_head()
+        options = DIRECTIONS
+        best = snake.direction
+        # 20% шанс попытаться подрезать игрока. В арене бот только ест: поля до сотен голов
+        # пришлось бы пересчитывать на каждом ходу
+        if self.mode != 'arena' and self.rng.random() < 0.2 and player.alive:
+            target = (px, py)
+            slot = ('snake', player.id)
+        else:
+            target = (fx, fy)
+            slot = ('food',)
+
+        # Поле BFS-расстояний до цели в обход стен и тел (из кэша: он чинится по ходам змей).
+        # Через края бот ходит только в режиме без стен
+        wrap = self.walls_type == 'No walls'
+        target_cell = self.grid.cell_index(target[0], target[1])
+        distances = None
+        if target_cell >= 0:
+            distances = self.pathfinder.distances(slot, target_cell, wrap)
+
+        # Бот решает сам когда ускоряться
+        # Ускоряется если: далеко от цели (>200 пикселей) или близко к опасности
+        distance_to_target = abs(head[0] - target[0]) + abs(head[1] - target[1])
+        snake.bot_speedup = distance_to_target > 200
+
+        # Оцениваем каждое направление
+        grid = self.grid
+        valid_moves = []
+        for d in options:
+            # Проверка разворота на 180 градусов
+            if (d[0] == -snake.direction[0] and d[1] == -snake.direction[1]):
+                continue
+
+            nx, ny = head[0] + d[0], head[1] + d[1]
+            if wrap:
+                # Без стен клетка за краем — на другой стороне поля
+                nx %= self.grid_width
+                ny %= self.grid_height
+            cell = grid.cell_index(nx, ny)
+
+            # Проверка границ (в режимах со стенами бот за край не ходит)
+            if cell < 0:
+                continue
+
+            # Проверка стены по битовой карте сетки
+            if grid.walls[cell]:
+                continue
+
+            # Проверка столкновения с собой и с другими змеями (бот избегает любых тел)
+            if grid.count[cell]:
+                continue
+
+            # Рассчитываем расстояние до цели: сначала по пути в обход препятствий, при равенстве — напрямую
+            dist = abs(target[0] - nx) + abs(target[1] - ny)
+            path = distances[cell] if distances is not None else UNREACHABLE
+            valid_moves.append((d, cell, path, dist))
+
+        # Проверка места: не заходим в карман, где не поместится тело. Заливка обрывается,
+        # как только насчитала длину змеи, так что цена не зависит от размера поля.
+        # Если безопасного хода нет, выбираем тот, где места больше всего
+        if len(valid_moves) > 1:
+            need = len(snake.body) + 1
+            scored = []
+            for d, cell, path, dist in valid_moves:
+                room = reachable_area(grid, cell, wrap, need)
+                scored.append((d, (room < need, -room, path, dist)))
+        else:
+            scored = [(d, (path, dist)) for d, cell, path, dist in valid_moves]
+
+        # Выбираем лучший ход из валидных
+        if scored:
+            scored.sort(key=lambda x: x[1])
+            best = scored[0][0]
+
+        snake.next_direction = best
+
+    def hamiltonian_move(self, snake):
+        """Ход бота по гамильтонову циклу; False, если здесь стратегия неприменима"""
+        # Цикл обходит все клетки, поэтому нужны поле без стен и змея одна на поле
+        if self.walls or any(s.alive and s is not snake for s in self.snakes):
+            return False
+        # Цикл строится один раз на размер поля и переживает новые игры и смену размера окна
+        path = hamiltonian_cycle(self.grid.cols, self.grid.rows)
+        if path is None:
+            return False
+        cycle, order = path
+        grid = self.grid
+        head = snake.get_head()
+        tail = snake.body[-1]
+        head_cell = grid.cell_index(head[0], head[1])
+        tail_cell = grid.cell_index(tail[0], tail[1])
+        if head_cell < 0 or tail_cell < 0:
+            return False
+        food = grid.cell_index(self.food['pos'][0], self.food['pos'][1]) if self.food is not None else -1
+
+        # Соседние клетки головы и направления к ним
+        wrap = self.walls_type == 'No walls'
+        moves = {}
+        for d in DIRECTIONS:
+            nx, ny = head[0] + d[0], head[1] + d[1]
+            if wrap:
+                nx %= self.grid_width
+                ny %= self.grid_height
+            cell = grid.cell_index(nx, ny)
+            if cell >= 0:
+                moves[cell] = d
+        candidates = [cell for cell in moves if not grid.count[cell]]
+        cell = hamiltonian_step(cycle, order, head_cell, tail_cell, len(snake.body), food,
+                                 snake.grow_pending, MAX_GROWTH, candidates)
+        if cell not in moves:
+            return False
+        snake.next_direction = moves[cell]
+        snake.bot_speedup = False
+        return True
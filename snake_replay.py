@@ -0,0 +1,240 @@
+# Повторы игр. Вся случайность игры идет через SnakeSimulation.rng, поэтому повтор — это только
+# seed, настройки и ввод: на каждый тик сколько мс прошло с прошлого тика (varint) и направления
+# змей игроков с флагом direction_changed (по 4 бита), плюс редкие вызовы между тиками
+# (силы, ускорение, смена размера поля).
+# Выходит 1–2 байта на тик до сжатия, сам файл еще и жмется zlib.
+import bisect
+import json
+import zlib
+
+from snake_core import SnakeSimulation, DIRECTIONS, ARENA_SNAKES
+
+MAGIC = b'SNKR'
+# Версия 2: змеи ходят по своему расписанию (SnakeSimulation.schedule), ускорение игрока — событие
+# Версия 3: вместе с направлением пишется direction_changed — снимки повтора совпадают с игрой байт в байт
+VERSION = 3
+# Методы симуляции, вызовы которых записываются и повторяются между тиками
+REPLAY_EVENTS = ('set_field_size', 'resize', 'apply_powerup', 'set_boost')
+
+
+def write_varint(out, value):
+    # Знаковое число: zigzag (0, -1, 1, -2, ... -> 0, 1, 2, 3, ...), потом по 7 бит на байт
+    value = value * 2 if value >= 0 else -value * 2 - 1
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    value = value >> 1 if value % 2 == 0 else -(value >> 1) - 1
+    return value, pos
+
+
+class ReplayRecorder:
+    # Пишет повтор по ходу игры: симуляция сама зовет record_tick и record_event
+    def __init__(self, sim):
+        self.header = {
+            'seed': sim.seed,
+            'move_delay': sim.move_delay,
+            'snake_color': list(sim.snake_color),
+            'mode': sim.mode,
+            'bot_color': list(sim.bot_color),
+            'walls_type': sim.walls_type,
+            'field_width': sim.field_width,
+            'field_height': sim.field_height,
+            'snakes': len(sim.snakes),
+        }
+        self.players = None  # Индексы змей игроков — их направления и пишутся; фиксируются на первом тике
+        self.events = []  # [тик, метод, аргументы]
+        self.ticks = bytearray()
+        self.tick_count = 0
+        self.last_ms = 0
+
+    def record_event(self, method, *args):
+        self.events.append([self.tick_count, method, list(args)])
+
+    def record_tick(self, sim, now_ms):
+        if self.players is None:
+            # Оболочки делают змей ботами и выбирают стратегию уже после создания игры
+            self.players = [i for i, snake in enumerate(sim.snakes) if not snake.is_bot]
+            self.header['bots'] = [snake.is_bot for snake in sim.snakes]
+            self.header['bot_strategy'] = sim.bot_strategy
+        write_varint(self.ticks, now_ms - self.last_ms)
+        self.last_ms = now_ms
+        # Направление игрока (2 бита) и флаг поворота за этот ход, две змеи на байт
+        packed = 0
+        for n, index in enumerate(self.players):
+            snake = sim.snakes[index]
+            packed |= (DIRECTIONS.index(snake.next_direction) | snake.direction_changed << 2) << (n % 2 * 4)
+            if n % 2 == 1:
+                self.ticks.append(packed)
+                packed = 0
+        if len(self.players) % 2:
+            self.ticks.append(packed)
+        self.tick_count += 1
+
+    def to_bytes(self):
+        meta = json.dumps({'header': self.header, 'events': self.events, 'ticks': self.tick_count}).encode()
+        body = bytearray()
+        write_varint(body, len(meta))
+        body += meta
+        body += self.ticks
+        return MAGIC + bytes([VERSION]) + zlib.compress(bytes(body), 9)
+
+
+class Replay:
+    # Разобранный повтор: настройки, события и ввод по тикам
+    def __init__(self, data):
+        if data[:4] != MAGIC:
+            raise ValueError('not a snake replay')
+        if data[4] != VERSION:
+            raise ValueError(f'unsupported replay version: {data[4]}')
+        body = zlib.decompress(data[5:])
+        size, pos = read_varint(body, 0)
+        meta = json.loads(body[pos:pos + size])
+        self.header = meta['header']
+        self.events = meta['events']
+        self.tick_count = meta['ticks']
+        self.ticks = body[pos + size:]
+
+    def new_simulation(self):
+        """Игра в начальном состоянии записи"""
+        header = self.header
+        sim = SnakeSimulation(header['move_delay'], tuple(header['snake_color']), mode=header['mode'],
+                              bot_color=tuple(header['bot_color']), walls_type=header['walls_type'],
+                              field_width=header['field_width'], field_height=header['field_height'],
+                              seed=header['seed'], arena_snakes=header.get('snakes', ARENA_SNAKES))
+        self.prepare(sim)
+        return sim
+
+    def prepare(self, sim):
+        """Настраивает только что созданную игру так же, как оболочка перед первым тиком"""
+        for snake, is_bot in zip(sim.snakes, self.header.get('bots', [])):
+            snake.is_bot = is_bot
+        sim.bot_strategy = self.header.get('bot_strategy', sim.bot_strategy)
+
+    def inputs(self):
+        """Ввод по тикам: (время тика в мс, {индекс змеи игрока: (направление, direction_changed)})"""
+        players = [i for i, is_bot in enumerate(self.header.get('bots', [])) if not is_bot]
+        ticks = self.ticks
+        pos = 0
+        now_ms = 0
+        for _ in range(self.tick_count):
+            dt, pos = read_varint(ticks, pos)
+            now_ms += dt
+            directions = {}
+            for n, index in enumerate(players):
+                if n % 2 == 0:
+                    packed = ticks[pos]
+                    pos += 1
+                nibble = packed >> (n % 2 * 4)
+                directions[index] = (DIRECTIONS[nibble & 3], bool(nibble & 4))
+            yield now_ms, directions
+
+    def play(self, sim=None):
+        """Пересимулирует игру; генератор отдает симуляцию после каждого тика"""
+        sim = sim or self.new_simulation()
+        events = iter(self.events)
+        event = next(events, None)
+        for tick, (now_ms, directions) in enumerate(self.inputs()):
+            while event is not None and event[0] <= tick:
+                self.apply_event(sim, event)
+                event = next(events, None)
+            self.apply_inputs(sim, directions)
+            sim.step(now_ms=now_ms)
+            yield sim
+        # События после последнего тика
+        while event is not None:
+            self.apply_event(sim, event)
+            event = next(events, None)
+
+    def apply_inputs(self, sim, directions):
+        """Ставит змеям игроков записанный ввод тика — таким, каким его оставил steer в игре"""
+        for index, (direction, changed) in directions.items():
+            snake = sim.snakes[index]
+            snake.next_direction = direction
+            snake.direction_changed = changed
+
+    def apply_event(self, sim, event):
+        _, method, args = event
+        if method not in REPLAY_EVENTS:
+            raise ValueError(f'unknown replay event: {method}')
+        getattr(sim, method)(*args)
+
+
+def replay_game(data):
+    """Пересимулирует повтор целиком и возвращает симуляцию в конечном состоянии"""
+    replay = Replay(data)
+    sim = replay.new_simulation()
+    for _ in replay.play(sim):
+        pass
+    return sim
+
+
+class ReplayPlayer:
+    # Проигрыватель повтора с перемоткой. При загрузке повтор один раз прогоняется без отрисовки,
+    # и каждые keyframe_interval тиков сохраняется ключевой кадр (SnakeSimulation.snapshot).
+    # Перемотка на любой тик — восстановить ближайший кадр слева и досчитать не больше интервала.
+    def __init__(self, replay, sim=None, keyframe_interval=256):
+        self.replay = replay
+        if sim is None:
+            sim = replay.new_simulation()
+        self.sim = sim
+        self.keyframe_interval = keyframe_interval
+        self.inputs = list(replay.inputs())
+        self.length = len(self.inputs)
+        self.times = [now_ms for now_ms, _ in self.inputs]
+        # Вызовы между тиками, по номеру тика
+        self.events = {}
+        for event in replay.events:
+            self.events.setdefault(event[0], []).append(event)
+        self.position = 0  # Сколько тиков сыграно
+        self.keyframes = [sim.snapshot()]
+        while self.position < self.length:
+            self.advance(1)
+        self.seek(0)
+
+    def advance(self, ticks=1):
+        """Играет ticks тиков вперед (не дальше конца повтора)"""
+        sim = self.sim
+        end = min(self.length, self.position + ticks)
+        while self.position < end:
+            tick = self.position
+            for event in self.events.get(tick, ()):
+                self.replay.apply_event(sim, event)
+            now_ms, directions = self.inputs[tick]
+            self.replay.apply_inputs(sim, directions)
+            sim.step(now_ms=now_ms)
+            self.position += 1
+            if self.position == len(self.keyframes) * self.keyframe_interval:
+                self.keyframes.append(sim.snapshot())
+
+    def seek(self, tick):
+        """Переходит к состоянию после tick тиков"""
+        tick = max(0, min(self.length, tick))
+        if tick < self.position or tick - self.position > self.keyframe_interval:
+            index = min(tick // self.keyframe_interval, len(self.keyframes) - 1)
+            self.sim.restore(self.keyframes[index])
+            self.position = index * self.keyframe_interval
+        self.advance(tick - self.position)
+
+    def tick_at_time(self, time_ms):
+        """Сколько тиков успело пройти к моменту time_ms игрового времени"""
+        return bisect.bisect_right(self.times, time_ms)
+
+    def time_ms(self, tick=None):
+        """Игровое время тика (мс, как записала оболочка)"""
+        tick = self.position if tick is None else tick
+        if tick == 0:
+            return self.inputs[0][0] if self.inputs else 0
+        return self.inputs[tick - 1][0]
@@ -0,0 +1,185 @@
+# Самоигра ботов: тысячи партий бот против бота (или бот в одиночку) в пуле процессов.
+# Каждая партия засевается детерминированно (base_seed + номер партии), поэтому любую можно переиграть.
+# Результаты партий приходят в родительский процесс потоком, по мере готовности, и сразу агрегируются.
+#
+#   python snake_selfplay.py --games 20000 --matchup bot-vs-bot --walls "With walls"
+#   python snake_selfplay.py --games 100 --matchup arena --snakes 200
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from collections import Counter
+
+from snake_core import SnakeSimulation, WIDTH, HEIGHT, CELL_SIZE, GREEN, BOT_STRATEGIES, ARENA_SNAKES, arena_field_size
+
+MATCHUPS = ('bot-vs-bot', 'bot-alone', 'arena')
+# Режим симуляции для каждого вида партий
+MATCHUP_MODES = {'bot-vs-bot': 'bot', 'bot-alone': 'single', 'arena': 'arena'}
+WALL_TYPES = ('No walls', 'Frame walls', 'With walls')
+
+
+def play_game(game, seed, matchup='bot-vs-bot', walls_type='No walls', move_delay=100,
+              field_width=WIDTH, field_height=HEIGHT, max_ticks=20000, bot_strategy='greedy',
+              arena_snakes=ARENA_SNAKES):
+    """Играет одну партию без окна и возвращает ее итоги словарем"""
+    sim = SnakeSimulation(move_delay, GREEN, mode=MATCHUP_MODES[matchup], walls_type=walls_type,
+                          field_width=field_width, field_height=field_height, seed=seed,
+                          arena_snakes=arena_snakes)
+    # Первая змея тоже бот (в режимах 'bot' и 'arena' она место игрока)
+    sim.snakes[0].is_bot = True
+    sim.bot_strategy = bot_strategy
+
+    # Время идет шагами в полхода: ускорившийся бот ходит каждый тик, обычный — через тик
+    dt = move_delay // 2 + 1
+    now_ms = 0
+    ticks = 0
+    while not sim.game_over and ticks < max_ticks:
+        now_ms += dt
+        sim.step(now_ms=now_ms)
+        ticks += 1
+
+    snakes = sim.snakes
+    alive = [i for i, s in enumerate(snakes) if s.alive]
+    winner = None
+    if len(snakes) > 1:
+        if len(alive) == 1:
+            winner = alive[0]
+        else:
+            # Оба живы (лимит тиков) или оба погибли — решают очки
+            best = max(s.score for s in snakes)
+            leaders = [i for i, s in enumerate(snakes) if s.score == best]
+            if len(leaders) == 1:
+                winner = leaders[0]
+    return {
+        'game': game,
+        'seed': seed,
+        'ticks': ticks,
+        'scores': [s.score for s in snakes],
+        'lengths': [len(s.body) for s in snakes],
+        'death_causes': [s.death_cause for s in snakes],
+        'winner': winner,
+        'board_full': sim.board_full,
+        'timeout': not sim.game_over,
+    }
+
+
+def _play(args):
+    game, seed, options = args
+    return play_game(game, seed, **options)
+
+
+def run_selfplay(games, base_seed=0, processes=None, chunksize=None, **options):
+    """Генератор итогов партий в порядке готовности. options передаются в play_game"""
+    processes = processes or multiprocessing.cpu_count()
+    if chunksize is None:
+        # Достаточно мелкие порции, чтобы процессы не простаивали в конце, и крупные, чтобы не тратиться на пересылку
+        chunksize = max(1, min(64, games // (processes * 8)))
+    tasks = ((game, base_seed + game, options) for game in range(games))
+    if processes == 1:
+        for task in tasks:
+            yield _play(task)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(_play, tasks, chunksize):
+            yield result
+
+
+class SelfPlayStats:
+    # Накопитель итогов: обновляется по одной партии, не храня их все
+    def __init__(self, seats):
+        self.games = 0
+        self.ticks = 0
+        self.timeouts = 0
+        self.board_full = 0
+        self.draws = 0
+        self.scores = [0] * seats
+        self.lengths = [0] * seats
+        self.best_scores = [0] * seats
+        self.wins = [0] * seats
+        self.death_causes = [Counter() for _ in range(seats)]
+
+    def add(self, result):
+        self.games += 1
+        self.ticks += result['ticks']
+        self.timeouts += result['timeout']
+        self.board_full += result['board_full']
+        for i, score in enumerate(result['scores']):
+            self.scores[i] += score
+            self.lengths[i] += result['lengths'][i]
+            self.best_scores[i] = max(self.best_scores[i], score)
+            self.death_causes[i][result['death_causes'][i] or 'alive'] += 1
+        if len(result['scores']) > 1:
+            if result['winner'] is None:
+                self.draws += 1
+            else:
+                self.wins[result['winner']] += 1
+
+    def summary(self):
+        games = max(1, self.games)
+        seats = []
+        for i in range(len(self.scores)):
+            seats.append({
+                'mean_score': self.scores[i] / games,
+                'best_score': self.best_scores[i],
+                'mean_length': self.lengths[i] / games,
+                'win_rate': self.wins[i] / games,
+                'death_causes': dict(self.death_causes[i]),
+            })
+        return {
+            'games': self.games,
+            'mean_ticks': self.ticks / games,
+            'timeouts': self.timeouts,
+            'board_full': self.board_full,
+            'draws': self.draws,
+            'seats': seats,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Self-play runner for the snake bot')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--matchup', choices=MATCHUPS, default='bot-vs-bot')
+    parser.add_argument('--walls', choices=WALL_TYPES, default='No walls')
+    parser.add_argument('--delay', type=int, default=100, help='move delay in ms (picks the wall count)')
+    parser.add_argument('--cols', type=int, help='field width in cells (default: 30, or sized to --snakes in the arena)')
+    parser.add_argument('--rows', type=int, help='field height in cells')
+    parser.add_argument('--snakes', type=int, default=ARENA_SNAKES, help='snakes in the arena')
+    parser.add_argument('--strategy', choices=BOT_STRATEGIES, default='greedy')
+    parser.add_argument('--max-ticks', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game; game i uses seed + i')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--results', help='write every game result to this file as JSON lines')
+    args = parser.parse_args(argv)
+    if args.matchup == 'arena':
+        field_width, field_height = arena_field_size(args.snakes)
+    else:
+        field_width, field_height = WIDTH, HEIGHT
+    if args.cols:
+        field_width = args.cols * CELL_SIZE
+    if args.rows:
+        field_height = args.rows * CELL_SIZE
+
+    seats = {'bot-vs-bot': 2, 'bot-alone': 1, 'arena': args.snakes}[args.matchup]
+    stats = SelfPlayStats(seats)
+    out = open(args.results, 'w') if args.results else None
+    started = time.time()
+    try:
+        for result in run_selfplay(args.games, base_seed=args.seed, processes=args.processes,
+                                   matchup=args.matchup, walls_type=args.walls, move_delay=args.delay,
+                                   field_width=field_width, field_height=field_height,
+                                   max_ticks=args.max_ticks, bot_strategy=args.strategy, arena_snakes=args.snakes):
+            stats.add(result)
+            if out:
+                out.write(json.dumps(result) + '\n')
+            if stats.games % 100 == 0:
+                print(f"\r{stats.games}/{args.games} games", end='', file=sys.stderr, flush=True)
+    finally:
+        if out:
+            out.close()
+    print(f"\r{stats.games}/{args.games} games in {time.time() - started:.1f}s", file=sys.stderr)
+    print(json.dumps(stats.summary(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+from snake_ai import UNREACHABLE, SparseField, distance_field
+from snake_core import CELL_SIZE, GREEN, SnakeSimulation, arena_field_size
+
+
+def known(field):
+    """Клетки с известным расстоянием (разреженное поле может хранить и UNREACHABLE)"""
+    cells = field.items() if isinstance(field, SparseField) else enumerate(field)
+    return {cell: d for cell, d in cells if d < UNREACHABLE}
+
+
+def check_fields_match_bfs(sim, ticks):
+    """После каждого тика поля из кэша бота совпадают с новым BFS по сетке"""
+    now = 0
+    for _ in range(ticks):
+        if sim.game_over:
+            break
+        now += 51
+        sim.step(now_ms=now)
+        pathfinder = sim.pathfinder
+        for slot, (target, wrap, *_rest) in list(pathfinder.fields.items()):
+            cached = pathfinder.distances(slot, target, wrap)
+            fresh = distance_field(sim.grid, target, wrap)
+            assert known(cached) == known(fresh)
+
+
+def test_cached_fields_match_bfs():
+    for walls in ('No walls', 'With walls'):
+        sim = SnakeSimulation(100, GREEN, mode='bot', walls_type=walls, seed=3)
+        for snake in sim.snakes:
+            snake.is_bot = True
+        check_fields_match_bfs(sim, 400)
+
+
+def test_cached_fields_match_bfs_in_arena():
+    width, height = arena_field_size(40)
+    sim = SnakeSimulation(100, GREEN, mode='arena', walls_type='With walls', field_width=width,
+                          field_height=height, seed=5, arena_snakes=40)
+    sim.snakes[0].is_bot = True
+    check_fields_match_bfs(sim, 150)
+
+
+def test_cached_fields_match_bfs_on_large_board():
+    sim = SnakeSimulation(100, GREEN, mode='bot', walls_type='No walls', field_width=300 * CELL_SIZE,
+                          field_height=300 * CELL_SIZE, seed=1)
+    for snake in sim.snakes:
+        snake.is_bot = True
+    check_fields_match_bfs(sim, 60)
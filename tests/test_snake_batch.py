@@ -0,0 +1,164 @@
+import random
+from collections import deque
+
+import numpy as np
+
+from snake_batch import EMPTY_STAMP, BatchSnakeEnv
+from snake_core import CELL_SIZE, DIRECTIONS, FOOD_TYPES, GREEN, RIGHT, UP, SnakeSimulation
+
+MOVE_DELAY = 100
+
+
+def cell_pos(env, cell):
+    return (int(cell) % env.cols * CELL_SIZE, int(cell) // env.cols * CELL_SIZE)
+
+
+def twin_simulation(env, walls_type):
+    """Одиночная игра snake_core на том же поле, с теми же стенами и едой, что игра 0 пакета"""
+    sim = SnakeSimulation(MOVE_DELAY, GREEN, mode='single', walls_type='No walls',
+                          field_width=env.cols * CELL_SIZE, field_height=env.rows * CELL_SIZE, seed=0)
+    # Стены берем из пакета: свои симуляция сгенерировала бы по-другому
+    sim.walls_type = walls_type
+    sim.walls = {cell_pos(env, cell) for cell in np.flatnonzero(env.walls[0])}
+    sim.grid.set_walls(sim.walls)
+    sync_food(env, sim)
+    return sim
+
+
+def sync_food(env, sim):
+    # Еду пакет и симуляция выбирают каждый своим генератором — ставим ту, что выбрал пакет
+    sim.food = {'pos': cell_pos(env, env.food[0]), 'type': FOOD_TYPES[env.food_type[0]]}
+
+
+def batch_body(env):
+    """Клетки тела игры 0 пакета от головы к хвосту"""
+    return [int(env.body[0, (env.head_ptr[0] - k) % env.cells]) for k in range(env.length[0])]
+
+
+def sim_body(env, sim):
+    return [y // CELL_SIZE * env.cols + x // CELL_SIZE for x, y in sim.snakes[0].body]
+
+
+def place(env, sim, cells, direction, food, food_type='normal', grow_pending=0):
+    """Ставит змею в клетки cells (от головы) в обоих движках, еду — в клетку food"""
+    cells = [y * env.cols + x for x, y in cells]
+    env.stamp[0] = EMPTY_STAMP
+    for k, cell in enumerate(cells):
+        env.body[0, len(cells) - 1 - k] = cell
+        env.stamp[0, cell] = env.moves[0] - k
+    env.head_ptr[0] = len(cells) - 1
+    env.length[0] = len(cells)
+    env.grow_pending[0] = grow_pending
+    env.direction[0] = DIRECTIONS.index(direction)
+    env.food[0] = food[1] * env.cols + food[0]
+    env.food_type[0] = FOOD_TYPES.index(food_type)
+    snake = sim.snakes[0]
+    snake.body = deque(cell_pos(env, cell) for cell in cells)
+    snake.direction = snake.next_direction = direction
+    snake.grow_pending = grow_pending
+    sim.rebuild_grid()
+    sync_food(env, sim)
+
+
+def step_both(env, sim, action):
+    """Один ход в обоих движках с одним вводом (-1 — без поворота)"""
+    now = sim.tick * MOVE_DELAY + MOVE_DELAY
+    sim.step({0: DIRECTIONS[action]} if action >= 0 else None, now)
+    return env.step(np.array([action]))
+
+
+def test_batch_matches_simulation_on_random_games():
+    rng = random.Random(1)
+    causes = set()
+    eaten = set()
+    wraps = 0
+    for trial in range(16):
+        cols, rows = rng.choice(((30, 30), (20, 15), (10, 8), (5, 4)))
+        walls_type = 'With walls' if trial % 2 else 'No walls'
+        env = BatchSnakeEnv(1, cols, rows, walls_type=walls_type, move_delay=50, seed=trial)
+        sim = twin_simulation(env, walls_type)
+        for _ in range(1000):
+            action = rng.randrange(-1, 4)
+            head = sim.snakes[0].get_head()
+            food = sim.food['type']
+            rewards, dones = step_both(env, sim, action)
+            snake = sim.snakes[0]
+            new_head = snake.get_head()
+            if abs(new_head[0] - head[0]) > CELL_SIZE or abs(new_head[1] - head[1]) > CELL_SIZE:
+                wraps += 1
+            if rewards[0]:
+                eaten.add(food)
+            assert dones[0] == sim.game_over
+            if dones[0]:
+                causes.add(snake.death_cause)
+                assert env.final_score[0] == snake.score
+                assert env.final_ticks[0] == sim.tick
+                assert env.won[0] == sim.board_full
+                # Пакет сам начал новую игру — и симуляцию начинаем заново
+                sim = twin_simulation(env, walls_type)
+                continue
+            assert batch_body(env) == sim_body(env, sim)
+            assert env.score[0] == snake.score
+            assert env.grow_pending[0] == snake.grow_pending
+            sync_food(env, sim)
+    # Случайные игры прошли через все правила, которые проверяет тест
+    assert {'wall', 'self'} <= causes
+    assert eaten == set(FOOD_TYPES)
+    assert wraps > 0
+
+
+def test_head_follows_the_leaving_tail():
+    # Квадрат 2x2: голова идет в клетку, которую в этот же ход освобождает хвост
+    env = BatchSnakeEnv(1, 6, 6, seed=1)
+    sim = twin_simulation(env, 'No walls')
+    square = [(1, 1), (1, 2), (2, 2), (2, 1)]
+    place(env, sim, square, UP, food=(4, 4))
+    for action in (0, 2, 1, 3, 0):
+        _, dones = step_both(env, sim, action)
+        assert not dones[0] and not sim.game_over
+        assert batch_body(env) == sim_body(env, sim)
+
+    # Растущая змея хвост не убирает — та же клетка смертельна
+    env = BatchSnakeEnv(1, 6, 6, seed=1)
+    sim = twin_simulation(env, 'No walls')
+    place(env, sim, square, UP, food=(4, 4), grow_pending=1)
+    _, dones = step_both(env, sim, 0)
+    assert dones[0] and sim.game_over
+    assert sim.snakes[0].death_cause == 'self'
+
+
+def test_old_stamps_expire_after_tail():
+    # Змея прошла по клеткам раньше: их метки в массиве остались, но тело уже не там
+    env = BatchSnakeEnv(1, 8, 8, seed=2)
+    sim = twin_simulation(env, 'No walls')
+    place(env, sim, [(3, 3), (2, 3), (1, 3)], RIGHT, food=(6, 6))
+    env.stamp[0, 4 * env.cols + 3] = env.moves[0] - 3
+    _, dones = step_both(env, sim, 2)
+    assert not dones[0] and not sim.game_over
+    assert batch_body(env) == sim_body(env, sim)
+
+    # А в середину живого тела — смерть в обоих движках
+    body = [(3, 3), (3, 4), (4, 4), (4, 3), (4, 2), (3, 2)]
+    place(env, sim, body, UP, food=(6, 6))
+    _, dones = step_both(env, sim, 0)
+    assert dones[0] and sim.game_over
+    assert sim.snakes[0].death_cause == 'self'
+
+
+def test_full_board_wins_and_resets():
+    env = BatchSnakeEnv(1, 3, 3, seed=3)
+    sim = twin_simulation(env, 'No walls')
+    # Змейка по всему полю 3x3, кроме одной клетки; в ней еда, а змея еще растет
+    body = [(1, 2), (0, 2), (0, 1), (1, 1), (2, 1), (2, 0), (1, 0), (0, 0)]
+    place(env, sim, body, RIGHT, food=(2, 2), grow_pending=1)
+    env.score[0] = sim.snakes[0].score = 70
+    rewards, dones = step_both(env, sim, -1)
+    assert dones[0] and sim.game_over and sim.board_full
+    assert env.won[0]
+    assert env.final_score[0] == sim.snakes[0].score == 70 + rewards[0]
+    assert env.final_ticks[0] == sim.tick
+    # Новая игра: змея длины 1 в центре, счет с нуля, еда не на змее
+    assert batch_body(env) == [env.start_cell]
+    assert env.score[0] == 0 and env.ticks[0] == 0 and env.grow_pending[0] == 0
+    assert 0 <= env.food[0] < env.cells and env.food[0] != env.start_cell
+    assert not env.occupied()[0, env.food[0]]
@@ -0,0 +1,136 @@
+import random
+from collections import deque
+
+from snake_core import CELL_SIZE, DIRECTIONS, DOWN, GREEN, LEFT, POWERUP_TYPES, RIGHT, UP, SnakeSimulation, arena_field_size
+
+
+def scripted_inputs(seed, ticks, mode, snakes):
+    """Случайный, но повторяемый ввод игроков: (направления, сила, время) на каждый тик"""
+    rng = random.Random(seed)
+    now = 0
+    script = []
+    for _ in range(ticks):
+        inputs = {i: rng.choice(DIRECTIONS) for i in range(snakes) if rng.random() < 0.2}
+        powerup = rng.choice(POWERUP_TYPES) if mode == 'power-up' and rng.random() < 0.02 else None
+        now += rng.randint(40, 130)
+        script.append((inputs, powerup, now))
+    return script
+
+
+def play(sim, script):
+    for inputs, powerup, now in script:
+        if sim.game_over:
+            break
+        if powerup:
+            sim.apply_powerup(powerup, now)
+        sim.step(inputs, now)
+
+
+def test_restore_continues_tick_for_tick():
+    for seed, mode, walls in ((1, 'single', 'With walls'), (2, 'bot', 'No walls'), (3, 'pvp', 'Frame walls'),
+                              (4, 'power-up', 'With walls')):
+        sim = SnakeSimulation(100, GREEN, mode=mode, walls_type=walls, seed=seed)
+        # Ботами, чтобы игра дожила до снимка; ввод все равно идет (разворот, ускорение змей)
+        for snake in sim.snakes:
+            snake.is_bot = True
+        script = scripted_inputs(seed, 600, mode, len(sim.snakes))
+        play(sim, script[:100])
+        assert not sim.game_over
+        data = sim.snapshot()
+        restored = SnakeSimulation(100, GREEN, mode=mode, walls_type=walls, seed=seed + 100)
+        restored.restore(data)
+        assert restored.snapshot() == data
+        for step in script[100:]:
+            play(sim, [step])
+            play(restored, [step])
+            assert restored.snapshot() == sim.snapshot()
+
+
+def place(sim, bodies, move_time=100):
+    """Ставит змей в клетки bodies (списки клеток от головы и направления); все ходят в move_time"""
+    for snake, (cells, direction) in zip(sim.snakes, bodies):
+        snake.body = deque((x * CELL_SIZE, y * CELL_SIZE) for x, y in cells)
+        snake.direction = snake.next_direction = direction
+        snake.next_move_time = move_time
+    sim.food = {'pos': (0, 0), 'type': 'normal'}
+    sim.rebuild_grid()
+    sim.rebuild_schedule()
+
+
+def test_head_on_is_not_a_body_collision():
+    sim = SnakeSimulation(100, GREEN, mode='pvp', walls_type='No walls', seed=1)
+    place(sim, [([(5, 5), (4, 5), (3, 5)], RIGHT), ([(7, 5), (8, 5), (9, 5)], LEFT)])
+    sim.step(now_ms=100)
+    assert [snake.death_cause for snake in sim.snakes] == ['head-on', 'head-on']
+
+    # Змея, которая на этом тике не ходит, — препятствие: в ее голову врезаются как в тело
+    sim = SnakeSimulation(100, GREEN, mode='pvp', walls_type='No walls', seed=1)
+    place(sim, [([(5, 5), (4, 5), (3, 5)], RIGHT), ([(6, 5), (7, 5), (8, 5)], LEFT)])
+    sim.snakes[1].next_move_time = 200
+    sim.rebuild_schedule()
+    sim.step(now_ms=100)
+    assert [snake.death_cause for snake in sim.snakes] == ['snake', None]
+
+
+def test_arena_head_on():
+    width, height = arena_field_size(7)
+    sim = SnakeSimulation(100, GREEN, mode='arena', walls_type='No walls', field_width=width,
+                          field_height=height, seed=2, arena_snakes=7)
+    # Змеи 1–3 сходятся в клетку (6, 5) с трех сторон, 4 и 5 — в клетку (11, 10); игрок и змея 6 в стороне
+    place(sim, [([(1, 15)], RIGHT),
+                ([(5, 5), (4, 5)], RIGHT), ([(7, 5), (8, 5)], LEFT), ([(6, 6), (6, 7)], UP),
+                ([(10, 10), (9, 10)], RIGHT), ([(12, 10), (13, 10)], LEFT),
+                ([(15, 15)], LEFT)])
+    for snake in sim.snakes[1:6]:
+        snake.is_bot = False
+    sim.step(now_ms=100)
+    assert [snake.death_cause for snake in sim.snakes] == [None] + ['head-on'] * 5 + [None]
+    assert not sim.game_over
+
+
+def test_boost_leaves_stale_schedule_entries_behind():
+    sim = SnakeSimulation(100, GREEN, mode='single', walls_type='No walls', seed=3)
+    place(sim, [([(5, 5), (4, 5)], RIGHT)])
+    snake = sim.snakes[0]
+    snake.last_move_time = 0
+    # Каждое переключение кладет в кучу новую запись; старые (100 и 50 мс) остаются в ней
+    sim.set_boost(0, True)
+    sim.set_boost(0, False)
+    sim.set_boost(0, True)
+    assert len(sim.schedule) == 4
+    assert sim.next_move_time() == snake.next_move_time == 50
+    sim.step(now_ms=40)
+    assert snake.moves == 0
+    sim.step(now_ms=50)
+    assert snake.moves == 1
+    # Запись на 100 мс от начала игры совпала с новым временем хода — змея все равно ходит один раз
+    sim.step(now_ms=100)
+    assert snake.moves == 2
+    sim.set_boost(0, False)
+    assert sim.next_move_time() == 200
+    sim.step(now_ms=150)
+    assert snake.moves == 2
+    sim.step(now_ms=200)
+    assert snake.moves == 3 and snake.alive
+
+
+def test_restored_game_spawns_the_same_food_on_a_crowded_board():
+    # Поле 10×10 почти целиком занято змеей-«змейкой» по строкам: случайные пробы почти всегда
+    # промахиваются, и еда выбирается из индекса свободных клеток
+    sim = SnakeSimulation(100, GREEN, mode='single', walls_type='No walls', field_width=200, field_height=200, seed=4)
+    cells = [(x if y % 2 else 9 - x, y) for y in range(9) for x in range(10)]
+    place(sim, [(cells[::-1], DOWN)])
+    # Несколько ходов по нижней строке перемешивают порядок списка свободных клеток (он зависит от истории)
+    for now in range(100, 600, 100):
+        sim.step({0: RIGHT} if now > 100 else None, now_ms=now)
+    assert sim.snakes[0].alive
+    grid = sim.grid
+    assert len(grid.free) < 15
+    assert [grid.nth_free_cell(k) for k in range(len(grid.free))] == sorted(grid.free)
+
+    restored = SnakeSimulation(100, GREEN, mode='single', walls_type='No walls', field_width=200,
+                               field_height=200, seed=5)
+    restored.restore(sim.snapshot())
+    assert restored.grid.free != grid.free
+    for _ in range(50):
+        assert restored.random_food() == sim.random_food()
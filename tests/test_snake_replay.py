@@ -0,0 +1,59 @@
+import random
+
+from snake_core import CELL_SIZE, DIRECTIONS, GREEN, POWERUP_TYPES, SnakeSimulation
+from snake_replay import Replay, ReplayPlayer, ReplayRecorder, replay_game
+
+
+def safe_direction(sim, snake, rng):
+    """Ход "игрока" для теста: случайный, но в свободную клетку, если такая есть (rng игры не трогает)"""
+    x, y = snake.get_head()
+    options = []
+    for d in DIRECTIONS:
+        if d[0] == -snake.direction[0] and d[1] == -snake.direction[1]:
+            continue
+        cell = sim.grid.cell_index((x + d[0] * CELL_SIZE) % sim.grid_width, (y + d[1] * CELL_SIZE) % sim.grid_height)
+        if cell >= 0 and sim.grid.is_free(cell):
+            options.append(d)
+    return rng.choice(options) if options else snake.direction
+
+
+def record_game(seed, mode, walls, ticks):
+    """Играет и записывает игру: игрок 0, ускорение, силы и смена размера поля по ходу"""
+    rng = random.Random(seed)
+    sim = SnakeSimulation(100, GREEN, mode=mode, walls_type=walls, seed=seed)
+    sim.replay = ReplayRecorder(sim)
+    now = 0
+    for tick in range(ticks):
+        if sim.game_over:
+            break
+        player = sim.snakes[0]
+        inputs = {0: safe_direction(sim, player, rng)} if rng.random() < 0.3 else None
+        if rng.random() < 0.05:
+            sim.set_boost(0, not player.boost)
+        if mode == 'power-up' and rng.random() < 0.02:
+            sim.apply_powerup(rng.choice(POWERUP_TYPES), now)
+        if tick == ticks // 2:
+            sim.set_field_size(sim.field_width - 4 * CELL_SIZE, sim.field_height)
+        now += rng.randint(15, 40)
+        sim.step(inputs, now)
+    return sim, sim.replay.to_bytes()
+
+
+def test_replay_reproduces_final_state():
+    modes = (('bot', 'No walls'), ('power-up', 'No walls'), ('single', 'Frame walls'))
+    for seed in range(60):
+        mode, walls = modes[seed % len(modes)]
+        sim, data = record_game(seed, mode, walls, 600)
+        assert Replay(data).tick_count > 20
+        # Снимки совпадают байт в байт, вместе с флагом поворота, который не успел примениться
+        assert replay_game(data).snapshot() == sim.snapshot(), seed
+
+
+def test_seek_matches_straight_playback():
+    _, data = record_game(4, 'bot', 'No walls', 1200)
+    replay = Replay(data)
+    states = [sim.snapshot() for sim in replay.play()]
+    player = ReplayPlayer(replay, keyframe_interval=64)
+    for tick in (len(states), 1, 200, 64, 65, len(states) // 2, 3):
+        player.seek(tick)
+        assert player.sim.snapshot() == states[tick - 1]